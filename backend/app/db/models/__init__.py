@@ -4,5 +4,7 @@
 from .user import User
 from .chat import Chat
 from .message import Message
+from .document_chunk import DocumentChunk
+from .document import Document
 
-__all__ = ["User", "Chat", "Message"]
+__all__ = ["User", "Chat", "Message", "DocumentChunk", "Document"]
@@ -0,0 +1,22 @@
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy import Text, String, Integer, TIMESTAMP, Index, func
+from app.db.base import Base
+
+# Catalog of ingested documents, one row per document, kept in step with its chunks
+class Document(Base):
+    __tablename__ = "document"
+    id: Mapped[str] = mapped_column(String(36), primary_key=True)  # document_id of its chunks
+    user_id: Mapped[str] = mapped_column(String(255), index=True)
+    title: Mapped[str | None] = mapped_column(Text)
+    source: Mapped[str | None] = mapped_column(Text)
+    file_hash: Mapped[str | None] = mapped_column(String(64))
+    chunk_count: Mapped[int] = mapped_column(Integer, default=0)
+    token_count: Mapped[int] = mapped_column(Integer, default=0)
+    min_chunk_tokens: Mapped[int] = mapped_column(Integer, default=0)
+    max_chunk_tokens: Mapped[int] = mapped_column(Integer, default=0)
+    created_at: Mapped[str] = mapped_column(TIMESTAMP(timezone=True), server_default=func.now())
+    updated_at: Mapped[str] = mapped_column(TIMESTAMP(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        Index("document_file_hash_idx", "user_id", "file_hash"),
+    )
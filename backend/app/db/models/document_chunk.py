@@ -0,0 +1,26 @@
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy import Text, String, Integer, BigInteger, LargeBinary, JSON, TIMESTAMP, Index, func
+from app.db.base import Base
+
+# Chunks of the in-process FAISS vector store; embeddings are raw float32 bytes
+class DocumentChunk(Base):
+    __tablename__ = "document_chunk"
+    id: Mapped[str] = mapped_column(String(36), primary_key=True)
+    vector_id: Mapped[int] = mapped_column(BigInteger, unique=True)  # FAISS id, derived from id
+    user_id: Mapped[str] = mapped_column(String(255), index=True)
+    document_id: Mapped[str] = mapped_column(String(36))
+    chunk_index: Mapped[int] = mapped_column(Integer, default=0)
+    title: Mapped[str | None] = mapped_column(Text)
+    source: Mapped[str | None] = mapped_column(Text)
+    token_count: Mapped[int] = mapped_column(Integer, default=0)
+    content: Mapped[str] = mapped_column(Text)
+    content_hash: Mapped[str] = mapped_column(String(64))
+    file_hash: Mapped[str | None] = mapped_column(String(64))
+    meta: Mapped[dict] = mapped_column(JSON, default=dict)
+    embedding: Mapped[bytes] = mapped_column(LargeBinary)  # float32 vector
+    created_at: Mapped[str] = mapped_column(TIMESTAMP(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        Index("document_chunk_document_idx", "user_id", "document_id", "chunk_index"),
+        Index("document_chunk_file_hash_idx", "user_id", "file_hash"),
+    )
@@ -4,9 +4,13 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from app.core.config import get_settings
 from app.core.security import SupabaseJWTMiddleware
-from app.db.base import engine, Base
-from app.db.models import User, Chat, Message  # Import models to register them
+from app.db.base import engine, Base, SessionLocal
+from app.db.models import User, Chat, Message, DocumentChunk, Document  # Import models to register them
 from app.routers import health, chats, messages, documents
+from app.services.embedding_service import embedding_service
+from app.services.executor_service import executor_service
+from app.services.document_catalog_service import document_catalog_service
+from app.services.vector_store_factory import vector_store_factory
 
 settings = get_settings()
 
@@ -37,6 +41,31 @@ def create_tables():
     # dev-only; use Alembic in real deployments
     Base.metadata.create_all(bind=engine)
 
+@app.on_event("startup")
+def build_document_catalog():
+    # Deployments upgraded from before the catalog have chunks but no catalog rows;
+    # without them RAG finds no documents and stats read zero
+    db = SessionLocal()
+    try:
+        total = document_catalog_service.ensure_built(db, vector_store_factory.get_vector_store())
+        if total is not None:
+            print(f"📚 Built document catalog with {total} documents from existing chunks")
+    except Exception as e:
+        # Another worker may be building it at the same time
+        print(f"⚠️ Could not build document catalog: {str(e)}")
+    finally:
+        db.close()
+
+@app.on_event("startup")
+def warm_up_embedding_model():
+    # Load the embedding model in the background; /health/ready reports when it is warm
+    if embedding_service.preload:
+        embedding_service.start_warmup()
+
+@app.on_event("shutdown")
+def shutdown_executors():
+    executor_service.shutdown()
+
 app.include_router(health.router)
 app.include_router(chats.router)
 app.include_router(messages.router)
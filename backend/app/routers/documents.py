@@ -1,20 +1,30 @@
 import os
+import hashlib
 import tempfile
 from typing import List, Optional
 from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form
 from sqlalchemy.orm import Session
 from app.db.base import get_db
 from app.services.rag_service import rag_service
-from app.schemas.document import DocumentUploadResponse, DocumentStatsResponse, DocumentDeleteResponse
+from app.services.executor_service import executor_service
+from app.schemas.document import (
+    DocumentUploadResponse,
+    DocumentReingestResponse,
+    DocumentStatsResponse,
+    DocumentDeleteResponse
+)
 
 router = APIRouter(prefix="/documents", tags=["documents"])
 
+UPLOAD_READ_SIZE = 1024 * 1024  # Bytes read from the upload stream at a time
+
 @router.post("/upload", response_model=DocumentUploadResponse)
 async def upload_document(
     file: Optional[UploadFile] = File(None),
     text_content: Optional[str] = Form(None),
     title: str = Form("Document"),
     user_id: str = Form(...),  # In a real app, get this from auth
+    force: bool = Form(False),  # Re-ingest even if this content was already uploaded
     db: Session = Depends(get_db)
 ):
     """Upload and ingest a document into the RAG system"""
@@ -27,10 +37,15 @@ async def upload_document(
             if not file.filename.lower().endswith('.pdf'):
                 raise HTTPException(status_code=400, detail="Only PDF files are supported")
             
-            # Save file temporarily
+            # Save file temporarily, fingerprinting it as it streams in
+            hasher = hashlib.sha256()
             with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as temp_file:
-                content = await file.read()
-                temp_file.write(content)
+                while True:
+                    block = await file.read(UPLOAD_READ_SIZE)
+                    if not block:
+                        break
+                    hasher.update(block)
+                    temp_file.write(block)
                 temp_file_path = temp_file.name
             
             try:
@@ -39,7 +54,9 @@ async def upload_document(
                     db=db,
                     user_id=user_id,
                     file_path=temp_file_path,
-                    title=title
+                    title=title,
+                    file_hash=hasher.hexdigest(),
+                    force=force
                 )
             finally:
                 # Clean up temporary file
@@ -50,7 +67,8 @@ async def upload_document(
                 db=db,
                 user_id=user_id,
                 text_content=text_content,
-                title=title
+                title=title,
+                force=force
             )
         
         if not result["success"]:
@@ -61,7 +79,8 @@ async def upload_document(
             document_id=result["document_id"],
             total_chunks=result["total_chunks"],
             stats=result["stats"],
-            title=result["title"]
+            title=result["title"],
+            deduplicated=result.get("deduplicated", False)
         )
         
     except HTTPException:
@@ -69,6 +88,74 @@ async def upload_document(
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error uploading document: {str(e)}")
 
+@router.put("/{document_id}", response_model=DocumentReingestResponse)
+async def reingest_document(
+    document_id: str,
+    file: Optional[UploadFile] = File(None),
+    text_content: Optional[str] = Form(None),
+    title: str = Form("Document"),
+    user_id: str = Form(...),  # In a real app, get this from auth
+    db: Session = Depends(get_db)
+):
+    """Replace a document with a new version, re-embedding only the chunks that changed"""
+    try:
+        if not file and not text_content:
+            raise HTTPException(status_code=400, detail="Either file or text_content must be provided")
+        
+        if file:
+            if not file.filename.lower().endswith('.pdf'):
+                raise HTTPException(status_code=400, detail="Only PDF files are supported")
+            
+            # Save file temporarily
+            with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as temp_file:
+                while True:
+                    block = await file.read(UPLOAD_READ_SIZE)
+                    if not block:
+                        break
+                    temp_file.write(block)
+                temp_file_path = temp_file.name
+            
+            try:
+                result = await rag_service.reingest_document(
+                    db=db,
+                    user_id=user_id,
+                    document_id=document_id,
+                    file_path=temp_file_path,
+                    title=title
+                )
+            finally:
+                # Clean up temporary file
+                os.unlink(temp_file_path)
+        else:
+            result = await rag_service.reingest_document(
+                db=db,
+                user_id=user_id,
+                document_id=document_id,
+                text_content=text_content,
+                title=title
+            )
+        
+        if not result["success"]:
+            status_code = 404 if result.get("not_found") else 500
+            raise HTTPException(status_code=status_code, detail=result["error"])
+        
+        return DocumentReingestResponse(
+            success=True,
+            document_id=result["document_id"],
+            total_chunks=result["total_chunks"],
+            unchanged_chunks=result["unchanged_chunks"],
+            moved_chunks=result["moved_chunks"],
+            inserted_chunks=result["inserted_chunks"],
+            deleted_chunks=result["deleted_chunks"],
+            stats=result["stats"],
+            title=result["title"]
+        )
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error re-ingesting document: {str(e)}")
+
 @router.get("/stats/{user_id}", response_model=DocumentStatsResponse)
 async def get_document_stats(
     user_id: str,
@@ -76,7 +163,7 @@ async def get_document_stats(
 ):
     """Get statistics about user's documents"""
     try:
-        stats = rag_service.get_user_document_stats(user_id, db)
+        stats = await executor_service.run_in_thread(rag_service.get_user_document_stats, user_id, db)
         
         if "error" in stats:
             raise HTTPException(status_code=500, detail=stats["error"])
@@ -100,7 +187,7 @@ async def delete_user_documents(
 ):
     """Delete all documents for a user"""
     try:
-        result = rag_service.delete_user_documents(user_id, db)
+        result = await executor_service.run_in_thread(rag_service.delete_user_documents, user_id, db)
         
         if not result["success"]:
             raise HTTPException(status_code=500, detail=result["error"])
@@ -1,6 +1,8 @@
 from fastapi import APIRouter, Request, HTTPException
+from fastapi.responses import JSONResponse
 from pydantic import BaseModel
 from app.core.config import get_settings
+from app.services.embedding_service import embedding_service
 from supabase import create_client
 
 router = APIRouter(prefix="/health", tags=["health"])
@@ -22,6 +24,12 @@ class LoginResponse(BaseModel):
 def ok(): 
     return {"ok": True}
 
+@router.get("/ready")
+def ready():
+    """Readiness probe: only ready once the embedding model is loaded and warm"""
+    status = embedding_service.get_status()
+    return JSONResponse(status_code=200 if status["ready"] else 503, content=status)
+
 @router.get("/auth-test")
 def auth_test(request: Request):
     """Test endpoint to check if authentication is working"""
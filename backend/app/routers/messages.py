@@ -50,8 +50,15 @@ async def create_message(body: MessageCreate, req: Request, db: Session = Depend
                 
                 if use_rag:
                     # Use RAG service for enhanced responses
+                    filters = None
+                    if body.ragFilters:
+                        filters = {
+                            "document_ids": body.ragFilters.documentIds,
+                            "sources": body.ragFilters.sources,
+                            "created_after": body.ragFilters.createdAfter
+                        }
                     result = await rag_service.generate_rag_response(
-                        db, chat_id, uid, body.content, body.llmProvider
+                        db, chat_id, uid, body.content, body.llmProvider, filters=filters
                     )
                 else:
                     # Use the regular function that creates user message and generates AI response
@@ -7,6 +7,14 @@ class DocumentStats(BaseModel):
     avg_tokens_per_chunk: float
     min_tokens: int
     max_tokens: int
+    truncated_chunks: Optional[int] = None
+    embedded_chunks: Optional[int] = None
+    embedding_seconds: Optional[float] = None
+    embedding_chunks_per_sec: Optional[float] = None
+    cache_hits: Optional[int] = None
+    cache_misses: Optional[int] = None
+    cache_hit_rate: Optional[float] = None
+    saved_embedding_seconds: Optional[float] = None
 
 class DocumentUploadResponse(BaseModel):
     success: bool
@@ -14,6 +22,19 @@ class DocumentUploadResponse(BaseModel):
     total_chunks: int
     stats: DocumentStats
     title: str
+    deduplicated: bool = False
+    error: Optional[str] = None
+
+class DocumentReingestResponse(BaseModel):
+    success: bool
+    document_id: str
+    total_chunks: int
+    unchanged_chunks: int
+    moved_chunks: int
+    inserted_chunks: int
+    deleted_chunks: int
+    stats: DocumentStats
+    title: str
     error: Optional[str] = None
 
 class DocumentStatsResponse(BaseModel):
@@ -6,12 +6,18 @@ from uuid import UUID
 Role = Literal["user","assistant","system"]
 LLMProvider = Literal["openai", "anthropic", "ollama", "huggingface"]
 
+class RagFilters(BaseModel):
+    documentIds: Optional[list[UUID]] = None  # Only retrieve from these documents
+    sources: Optional[list[str]] = None  # Only retrieve chunks with these sources
+    createdAfter: Optional[datetime] = None  # Only retrieve chunks ingested at or after this time
+
 class MessageCreate(BaseModel):
     chatId: Optional[UUID] = None  # Optional - if not provided, new chat will be created
     role: Role
     content: str
     llmProvider: Optional[LLMProvider] = None  # Optional LLM provider for user messages
     useRag: Optional[bool] = False  # Whether to use RAG for enhanced responses
+    ragFilters: Optional[RagFilters] = None  # Optional restrictions on what RAG retrieves
 
 class MessageOut(BaseModel):
     id: UUID
@@ -0,0 +1,158 @@
+from datetime import datetime
+from typing import Dict, Any, Iterable, Iterator, Optional
+from sqlalchemy import select, delete, func
+from sqlalchemy.orm import Session
+from app.db.models.document import Document
+
+class DocumentCatalogService:
+    """
+    Service for the document catalog: one row per ingested document with its
+    title, source, file hash, chunk and token counts.
+    
+    The vector stores update the catalog in the same transaction as the
+    chunks they write or delete, so stats, duplicate lookups and "does this
+    user have any documents" never have to scan chunk rows.
+    """
+    
+    def tally(self, documents: Iterable[Dict[str, Any]], summaries: Dict[str, Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+        """Pass chunks through, summarizing them per document_id into summaries"""
+        for doc in documents:
+            document_id = doc.get("document_id")
+            if document_id:
+                token_count = doc.get("token_count", 0)
+                summary = summaries.get(document_id)
+                if summary is None:
+                    summary = summaries[document_id] = {
+                        "title": doc.get("title"),
+                        "source": doc.get("source"),
+                        "file_hash": doc.get("file_hash"),
+                        "chunk_count": 0,
+                        "token_count": 0,
+                        "min_chunk_tokens": token_count,
+                        "max_chunk_tokens": token_count
+                    }
+                summary["chunk_count"] += 1
+                summary["token_count"] += token_count
+                summary["min_chunk_tokens"] = min(summary["min_chunk_tokens"], token_count)
+                summary["max_chunk_tokens"] = max(summary["max_chunk_tokens"], token_count)
+            yield doc
+    
+    def add_chunks(self, db: Session, user_id: str, summaries: Dict[str, Dict[str, Any]]) -> None:
+        """
+        Add tallied chunks to their documents' entries, creating them as
+        needed. Flushes, so a later db.get in the same transaction (e.g.
+        replace_document during re-ingest) sees new entries; does not commit
+        """
+        for document_id, summary in summaries.items():
+            document = db.get(Document, document_id)
+            if document is None:
+                db.add(Document(id=document_id, user_id=user_id, **summary))
+                continue
+            document.chunk_count += summary["chunk_count"]
+            document.token_count += summary["token_count"]
+            document.min_chunk_tokens = min(document.min_chunk_tokens, summary["min_chunk_tokens"])
+            document.max_chunk_tokens = max(document.max_chunk_tokens, summary["max_chunk_tokens"])
+            document.updated_at = datetime.now()
+        db.flush()
+    
+    def replace_document(self, db: Session, user_id: str, document_id: str, summary: Optional[Dict[str, Any]]) -> None:
+        """Set a document's entry to summarize its new version; None removes it. Does not commit"""
+        document = db.get(Document, document_id)
+        if summary is None:
+            if document is not None:
+                db.delete(document)
+            return
+        if document is None:
+            db.add(Document(id=document_id, user_id=user_id, **summary))
+            return
+        for field, value in summary.items():
+            setattr(document, field, value)
+        document.updated_at = datetime.now()
+    
+    def delete_user_documents(self, db: Session, user_id: str) -> None:
+        """Remove all of a user's entries; does not commit"""
+        db.execute(delete(Document).where(Document.user_id == user_id))
+    
+    def find_by_hash(self, db: Session, user_id: str, file_hash: str) -> Optional[Dict[str, Any]]:
+        """Find a document the user already ingested from identical content"""
+        document = db.execute(
+            select(Document).where(Document.user_id == user_id, Document.file_hash == file_hash).limit(1)
+        ).scalar_one_or_none()
+        if document is None:
+            return None
+        
+        return {
+            "document_id": document.id,
+            "title": document.title,
+            "stats": {
+                "total_chunks": document.chunk_count,
+                "total_tokens": document.token_count,
+                "avg_tokens_per_chunk": (
+                    round(document.token_count / document.chunk_count, 2) if document.chunk_count else 0
+                ),
+                "min_tokens": document.min_chunk_tokens,
+                "max_tokens": document.max_chunk_tokens
+            }
+        }
+    
+    def chunk_count(self, db: Session, user_id: str) -> int:
+        """Total chunks across the user's documents"""
+        return int(db.execute(
+            select(func.coalesce(func.sum(Document.chunk_count), 0)).where(Document.user_id == user_id)
+        ).scalar())
+    
+    def has_documents(self, db: Session, user_id: str) -> bool:
+        return db.execute(
+            select(Document.id).where(Document.user_id == user_id).limit(1)
+        ).first() is not None
+    
+    def get_stats(self, db: Session, user_id: str) -> Dict[str, Any]:
+        """Document count, chunk count and distinct sources of a user's documents"""
+        row = db.execute(
+            select(func.count(), func.coalesce(func.sum(Document.chunk_count), 0))
+            .where(Document.user_id == user_id)
+        ).one()
+        sources = db.execute(
+            select(Document.source).where(Document.user_id == user_id).distinct()
+        ).scalars().all()
+        
+        return {
+            "total_documents": row[0],
+            "total_chunks": int(row[1]),
+            "sources": sorted(source for source in sources if source)
+        }
+    
+    def ensure_built(self, db: Session, vector_store) -> Optional[int]:
+        """
+        Build the catalog from vector_store when it is empty but chunks exist,
+        as on a deployment whose documents predate the catalog. Returns the
+        number of documents cataloged, or None when nothing needed doing.
+        """
+        if db.execute(select(Document.id).limit(1)).first() is not None:
+            return None
+        if not vector_store.has_chunks(db):
+            return None
+        return self.rebuild(db, vector_store.document_summaries(db))
+    
+    def rebuild(self, db: Session, summaries: Iterable[Dict[str, Any]]) -> int:
+        """
+        Replace the whole catalog with summaries carrying document_id and
+        user_id, as produced by a vector store's document_summaries. Commits;
+        returns the number of documents cataloged.
+        """
+        try:
+            db.execute(delete(Document))
+            total = 0
+            for summary in summaries:
+                summary = dict(summary)
+                db.add(Document(id=summary.pop("document_id"), **summary))
+                total += 1
+            db.commit()
+            return total
+        
+        except Exception as e:
+            db.rollback()
+            raise Exception(f"Error rebuilding document catalog: {str(e)}")
+
+# Global document catalog service instance
+document_catalog_service = DocumentCatalogService()
@@ -1,12 +1,29 @@
 import os
 import re
-from typing import List, Dict, Any, Optional
+import hashlib
+from bisect import bisect_left, bisect_right
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import List, Dict, Any, Iterator, Optional, Tuple
 from datetime import datetime
 from uuid import uuid4
 import tiktoken
 from pypdf import PdfReader
 from decouple import config
 
+# A sentence runs up to and including its terminal punctuation
+SENTENCE_END_PATTERN = re.compile(r'[.!?]+')
+
+FINGERPRINT_BLOCK_SIZE = 1024 * 1024
+
+# [CLS] and [SEP] take two of the embedding model's max_seq_length tokens
+EMBEDDING_SPECIAL_TOKENS = 2
+
+def _extract_page_range(file_path: str, start: int, end: int) -> List[str]:
+    """Extract the text of pages [start, end) of a PDF; runs in a worker process"""
+    reader = PdfReader(file_path)
+    return [reader.pages[i].extract_text() or "" for i in range(start, end)]
+
 class DocumentProcessor:
     """Service for processing and chunking documents"""
     
@@ -14,119 +31,330 @@ class DocumentProcessor:
         self.chunk_size = int(config("CHUNK_SIZE", default="1000"))
         self.chunk_overlap = int(config("CHUNK_OVERLAP", default="200"))
         self.encoding = tiktoken.get_encoding("cl100k_base")  # OpenAI's encoding
+        self.extract_workers = int(config("PDF_EXTRACT_WORKERS", default="1"))
+        self.pages_per_task = max(1, int(config("PDF_PAGES_PER_TASK", default="8")))
+        # "tiktoken" sizes chunks in cl100k_base tokens; "embedding" sizes them
+        # with the embedding model's tokenizer so chunks fit its max_seq_length
+        self.chunking_mode = config("CHUNKING_MODE", default="tiktoken")
+    
+    @property
+    def embedding_aligned(self) -> bool:
+        return self.chunking_mode == "embedding"
     
     def count_tokens(self, text: str) -> int:
         """Count tokens in text using tiktoken"""
         return len(self.encoding.encode(text))
     
+    def _embedding_tokenizer(self):
+        from app.services.embedding_service import embedding_service
+        return embedding_service.get_tokenizer()
+    
+    def embedding_token_limit(self) -> int:
+        """Tokens of chunk text the embedding model sees, excluding its special tokens"""
+        from app.services.embedding_service import embedding_service
+        return embedding_service.get_max_seq_length() - EMBEDDING_SPECIAL_TOKENS
+    
+    def count_truncated_chunks(self, texts: List[str]) -> int:
+        """Count chunks the embedding model would truncate at its max_seq_length"""
+        if not texts:
+            return 0
+        limit = self.embedding_token_limit()
+        encoded = self._embedding_tokenizer()(texts, add_special_tokens=False, verbose=False)
+        return sum(1 for input_ids in encoded["input_ids"] if len(input_ids) > limit)
+    
+    def _default_chunk_settings(self) -> Tuple[int, int]:
+        """Chunk size and overlap for the current chunking mode"""
+        if not self.embedding_aligned:
+            return self.chunk_size, self.chunk_overlap
+        
+        # Keep the configured overlap ratio at the embedding model's size
+        chunk_size = self.embedding_token_limit()
+        return chunk_size, self.chunk_overlap * chunk_size // max(1, self.chunk_size)
+    
+    def _token_offsets(self, text: str) -> List[int]:
+        """Character offset at which each token of text starts"""
+        if self.embedding_aligned:
+            encoded = self._embedding_tokenizer()(
+                text, add_special_tokens=False, return_offsets_mapping=True, verbose=False
+            )
+            return [start for start, _ in encoded["offset_mapping"]]
+        
+        _, token_offsets = self.encoding.decode_with_offsets(self.encoding.encode_ordinary(text))
+        return token_offsets
+    
     def chunk_text(self, text: str, chunk_size: Optional[int] = None, chunk_overlap: Optional[int] = None) -> List[str]:
         """Split text into chunks with overlap"""
+        return [chunk for chunk, _ in self.chunk_text_with_token_counts(text, chunk_size, chunk_overlap)]
+    
+    def chunk_text_with_token_counts(
+        self,
+        text: str,
+        chunk_size: Optional[int] = None,
+        chunk_overlap: Optional[int] = None
+    ) -> List[Tuple[str, int]]:
+        """Split text into chunks with overlap and return (chunk, token_count) pairs"""
+        return [
+            (text[char_start:char_end].strip(), token_count)
+            for char_start, char_end, token_count in self._chunk_spans(text, chunk_size, chunk_overlap)
+        ]
+    
+    def _chunk_spans(
+        self,
+        text: str,
+        chunk_size: Optional[int] = None,
+        chunk_overlap: Optional[int] = None
+    ) -> List[Tuple[int, int, int]]:
+        """
+        Pack sentences into chunks using token offsets.
+        
+        The text is encoded once; sentence boundaries are mapped onto token
+        offsets and chunks are packed greedily so that every chunk holds at most
+        chunk_size tokens. Consecutive chunks share whole trailing sentences of
+        at most chunk_overlap tokens. Returns (char_start, char_end, token_count)
+        spans into text.
+        """
+        default_size, default_overlap = self._default_chunk_settings()
         if chunk_size is None:
-            chunk_size = self.chunk_size
+            chunk_size = default_size
         if chunk_overlap is None:
-            chunk_overlap = self.chunk_overlap
+            chunk_overlap = default_overlap
+        chunk_size = max(1, chunk_size)
+        chunk_overlap = max(0, min(chunk_overlap, chunk_size - 1))
         
-        # Split by sentences first
-        sentences = re.split(r'[.!?]+', text)
-        chunks = []
-        current_chunk = ""
+        if not text.strip():
+            return []
         
-        for sentence in sentences:
-            sentence = sentence.strip()
-            if not sentence:
-                continue
+        token_offsets = self._token_offsets(text)
+        total_tokens = len(token_offsets)
+        
+        # Token boundaries at sentence ends; sentences longer than a chunk are
+        # split into chunk_size pieces so every piece fits on its own
+        boundaries = [0]
+        for match in SENTENCE_END_PATTERN.finditer(text):
+            boundary = bisect_left(token_offsets, match.end())
+            while boundary - boundaries[-1] > chunk_size:
+                boundaries.append(boundaries[-1] + chunk_size)
+            if boundary > boundaries[-1]:
+                boundaries.append(boundary)
+        while total_tokens - boundaries[-1] > chunk_size:
+            boundaries.append(boundaries[-1] + chunk_size)
+        if total_tokens > boundaries[-1]:
+            boundaries.append(total_tokens)
+        
+        def char_offset(token_index: int) -> int:
+            return token_offsets[token_index] if token_index < total_tokens else len(text)
+        
+        spans = []
+        start = 0
+        last = len(boundaries) - 1
+        while start < last:
+            # Extend the chunk while the next sentence still fits
+            end = start + 1
+            while end < last and boundaries[end + 1] - boundaries[start] <= chunk_size:
+                end += 1
             
-            # Check if adding this sentence would exceed chunk size
-            test_chunk = current_chunk + " " + sentence if current_chunk else sentence
-            if self.count_tokens(test_chunk) <= chunk_size:
-                current_chunk = test_chunk
-            else:
-                # Current chunk is full, save it
-                if current_chunk:
-                    chunks.append(current_chunk.strip())
-                
-                # Start new chunk with overlap
-                if chunk_overlap > 0 and chunks:
-                    # Get last few sentences from previous chunk for overlap
-                    last_chunk_sentences = re.split(r'[.!?]+', chunks[-1])
-                    overlap_text = " ".join(last_chunk_sentences[-2:])  # Last 2 sentences
-                    current_chunk = overlap_text + " " + sentence
-                else:
-                    current_chunk = sentence
-        
-        # Add the last chunk
-        if current_chunk:
-            chunks.append(current_chunk.strip())
-        
-        return chunks
-    
-    def process_pdf(self, file_path: str, user_id: str) -> List[Dict[str, Any]]:
+            token_start, token_end = boundaries[start], boundaries[end]
+            if text[char_offset(token_start):char_offset(token_end)].strip():
+                spans.append((char_offset(token_start), char_offset(token_end), token_end - token_start))
+            if end == last:
+                break
+            
+            # Start the next chunk on the earliest sentence that keeps the
+            # overlap within budget and still leaves room for the next sentence
+            next_start = end
+            while (
+                next_start - 1 > start
+                and token_end - boundaries[next_start - 1] <= chunk_overlap
+                and boundaries[end + 1] - boundaries[next_start - 1] <= chunk_size
+            ):
+                next_start -= 1
+            start = next_start
+        
+        return spans
+    
+    def process_pdf(self, file_path: str, user_id: str, title: Optional[str] = None) -> List[Dict[str, Any]]:
         """Process a PDF file and return chunks"""
+        return list(self.iter_pdf_chunks(file_path, user_id, title))
+    
+    def iter_pdf_pages(
+        self,
+        file_path: str,
+        workers: Optional[int] = None,
+        executor: Optional[Executor] = None
+    ) -> Iterator[str]:
+        """
+        Lazily extract the text of each PDF page, in page order.
+        
+        With more than one worker, or with a shared executor, page ranges are
+        extracted in a process pool. At most two ranges per worker are in
+        flight so that extraction never runs far ahead of the consumer;
+        workers defaults to PDF_EXTRACT_WORKERS.
+        """
+        if workers is None:
+            workers = max(1, self.extract_workers)
+        
+        reader = PdfReader(file_path)
+        if executor is None and workers <= 1:
+            for page in reader.pages:
+                yield page.extract_text() or ""
+            return
+        
+        num_pages = len(reader.pages)
+        page_ranges = [
+            (start, min(start + self.pages_per_task, num_pages))
+            for start in range(0, num_pages, self.pages_per_task)
+        ]
+        
+        owns_executor = executor is None
+        if owns_executor:
+            executor = ProcessPoolExecutor(max_workers=workers)
+        pending = deque()
         try:
-            reader = PdfReader(file_path)
-            text = ""
-            
-            # Extract text from all pages
-            for page in reader:
-                text += page.extract_text() + "\n"
-            
-            # Clean up text
-            text = self.clean_text(text)
-            
-            # Chunk the text
-            chunks = self.chunk_text(text)
-            
-            # Create document chunks
-            document_chunks = []
-            document_id = str(uuid4())
-            
-            for i, chunk in enumerate(chunks):
-                document_chunks.append({
-                    "content": chunk,
-                    "user_id": user_id,
-                    "source": "pdf",
-                    "title": os.path.basename(file_path),
-                    "chunk_index": i,
-                    "document_id": document_id,
-                    "created_at": datetime.now().isoformat(),
-                    "token_count": self.count_tokens(chunk)
-                })
+            for start, end in page_ranges:
+                pending.append(executor.submit(_extract_page_range, file_path, start, end))
+                if len(pending) >= workers * 2:
+                    yield from pending.popleft().result()
+            while pending:
+                yield from pending.popleft().result()
+        finally:
+            if owns_executor:
+                executor.shutdown(wait=True, cancel_futures=True)
+            else:
+                for future in pending:
+                    future.cancel()
+    
+    def iter_pdf_chunks(
+        self,
+        file_path: str,
+        user_id: str,
+        title: Optional[str] = None,
+        document_id: Optional[str] = None,
+        executor: Optional[Executor] = None
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Stream chunks from a PDF one page at a time.
+        
+        Only the text that has not yet been emitted is kept in memory. After
+        each page the buffer is re-chunked and every chunk whose end and
+        successor are settled is yielded, so chunks spanning pages come out as
+        soon as they are complete. Each chunk records its page range. Pages are
+        extracted in executor when one is given.
+        """
+        title = title or os.path.basename(file_path)
+        document_id = document_id or str(uuid4())
+        
+        buffer = ""
+        page_offsets: List[int] = []  # Buffer offset where each page starts
+        page_numbers: List[int] = []
+        chunk_index = 0
+        
+        def page_at(char_offset: int) -> int:
+            return page_numbers[bisect_right(page_offsets, char_offset) - 1]
+        
+        def build_chunks(spans: List[Tuple[int, int, int]]) -> Iterator[Dict[str, Any]]:
+            nonlocal chunk_index
+            for char_start, char_end, token_count in spans:
+                chunk = self._build_chunk(
+                    buffer[char_start:char_end].strip(), token_count, user_id,
+                    "pdf", title, chunk_index, document_id
+                )
+                chunk["page_start"] = page_at(char_start)
+                chunk["page_end"] = page_at(char_end - 1)
+                chunk_index += 1
+                yield chunk
+        
+        try:
+            for page_number, page_text in enumerate(self.iter_pdf_pages(file_path, executor=executor), start=1):
+                page_text = self.clean_text(page_text)
+                if not page_text:
+                    continue
+                
+                if buffer:
+                    buffer += " "
+                page_offsets.append(len(buffer))
+                page_numbers.append(page_number)
+                buffer += page_text
+                
+                # The last chunk may still grow and the start of the one before
+                # it depends on the size of the sentence that follows it, so
+                # only chunks before those two are final
+                spans = self._chunk_spans(buffer)
+                if len(spans) <= 2:
+                    continue
+                yield from build_chunks(spans[:-2])
+                
+                cut = spans[-2][0]
+                first_page = bisect_right(page_offsets, cut) - 1
+                page_offsets = [max(0, offset - cut) for offset in page_offsets[first_page:]]
+                page_numbers = page_numbers[first_page:]
+                buffer = buffer[cut:]
             
-            return document_chunks
+            yield from build_chunks(self._chunk_spans(buffer))
             
         except Exception as e:
             raise Exception(f"Error processing PDF: {str(e)}")
     
-    def process_text(self, text: str, user_id: str, title: str = "Text Document") -> List[Dict[str, Any]]:
+    def process_text(
+        self,
+        text: str,
+        user_id: str,
+        title: str = "Text Document",
+        document_id: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
         """Process plain text and return chunks"""
         try:
             # Clean up text
             text = self.clean_text(text)
             
             # Chunk the text
-            chunks = self.chunk_text(text)
+            chunks = self.chunk_text_with_token_counts(text)
             
             # Create document chunks
-            document_chunks = []
-            document_id = str(uuid4())
-            
-            for i, chunk in enumerate(chunks):
-                document_chunks.append({
-                    "content": chunk,
-                    "user_id": user_id,
-                    "source": "text",
-                    "title": title,
-                    "chunk_index": i,
-                    "document_id": document_id,
-                    "created_at": datetime.now().isoformat(),
-                    "token_count": self.count_tokens(chunk)
-                })
+            document_id = document_id or str(uuid4())
+            document_chunks = [
+                self._build_chunk(chunk, token_count, user_id, "text", title, i, document_id)
+                for i, (chunk, token_count) in enumerate(chunks)
+            ]
             
             return document_chunks
             
         except Exception as e:
             raise Exception(f"Error processing text: {str(e)}")
     
+    def _build_chunk(
+        self,
+        content: str,
+        token_count: int,
+        user_id: str,
+        source: str,
+        title: str,
+        chunk_index: int,
+        document_id: str
+    ) -> Dict[str, Any]:
+        """Build the chunk dict handed to the vector store"""
+        return {
+            "content": content,
+            "user_id": user_id,
+            "source": source,
+            "title": title,
+            "chunk_index": chunk_index,
+            "document_id": document_id,
+            "created_at": datetime.now().isoformat(),
+            "token_count": token_count
+        }
+    
+    def fingerprint_file(self, file_path: str) -> str:
+        """sha256 of a file's bytes, read in blocks"""
+        hasher = hashlib.sha256()
+        with open(file_path, "rb") as f:
+            for block in iter(lambda: f.read(FINGERPRINT_BLOCK_SIZE), b""):
+                hasher.update(block)
+        return hasher.hexdigest()
+    
+    def fingerprint_text(self, text: str) -> str:
+        """sha256 of text content"""
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+    
     def clean_text(self, text: str) -> str:
         """Clean and normalize text"""
         # Remove extra whitespace
@@ -142,16 +370,24 @@ class DocumentProcessor:
     
     def get_chunk_stats(self, chunks: List[Dict[str, Any]]) -> Dict[str, Any]:
         """Get statistics about document chunks"""
-        total_tokens = sum(chunk.get("token_count", 0) for chunk in chunks)
-        avg_tokens_per_chunk = total_tokens / len(chunks) if chunks else 0
+        return self.get_token_stats([chunk.get("token_count", 0) for chunk in chunks])
+    
+    def get_token_stats(self, token_counts: List[int]) -> Dict[str, Any]:
+        """Get statistics from per-chunk token counts"""
+        total_tokens = sum(token_counts)
+        avg_tokens_per_chunk = total_tokens / len(token_counts) if token_counts else 0
         
         return {
-            "total_chunks": len(chunks),
+            "total_chunks": len(token_counts),
             "total_tokens": total_tokens,
             "avg_tokens_per_chunk": round(avg_tokens_per_chunk, 2),
-            "min_tokens": min(chunk.get("token_count", 0) for chunk in chunks) if chunks else 0,
-            "max_tokens": max(chunk.get("token_count", 0) for chunk in chunks) if chunks else 0
+            "min_tokens": min(token_counts) if token_counts else 0,
+            "max_tokens": max(token_counts) if token_counts else 0
         }
 
 # Global document processor instance
 document_processor = DocumentProcessor()
+
+def process_text_chunks(text: str, user_id: str, title: str, document_id: str) -> List[Dict[str, Any]]:
+    """Chunk plain text with this process's document processor; picklable for process pools"""
+    return document_processor.process_text(text, user_id, title, document_id)
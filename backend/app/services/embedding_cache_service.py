@@ -0,0 +1,108 @@
+import hashlib
+from functools import lru_cache
+from typing import Dict, Iterable
+import numpy as np
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from decouple import config
+from app.core.cache import LRUCache
+
+def normalize_chunk_text(text: str) -> str:
+    """Normalize chunk text before hashing so whitespace differences still hit"""
+    return " ".join(text.split())
+
+def content_hash(text: str) -> str:
+    """sha256 of the normalized chunk text"""
+    return hashlib.sha256(normalize_chunk_text(text).encode("utf-8")).hexdigest()
+
+def parse_vector(value) -> np.ndarray:
+    """Parse a pgvector value returned as text, e.g. '[0.1,0.2]', into a float32 array"""
+    if isinstance(value, str):
+        return np.fromstring(value.strip("[]"), sep=",", dtype=np.float32)
+    return np.asarray(value, dtype=np.float32)
+
+@lru_cache(maxsize=8)
+def _vector_format(dimension: int) -> str:
+    # %.9g round-trips every float32 exactly
+    return "[" + ",".join(["%.9g"] * dimension) + "]"
+
+def vector_literal(embedding) -> str:
+    """Format a float32 vector as a compact pgvector text literal"""
+    values = np.asarray(embedding, dtype=np.float32)
+    return _vector_format(len(values)) % tuple(values.tolist())
+
+class EmbeddingCacheService:
+    """
+    Content-addressed embedding cache keyed by (model name, content hash).
+    
+    An in-process LRU sits in front of the embedding_cache table. The table is
+    only used on Postgres; other databases get the in-process layer alone.
+    """
+    
+    def __init__(self):
+        self.enabled = config("EMBEDDING_CACHE_ENABLED", default="true").lower() == "true"
+        self.memory = LRUCache(int(config("EMBEDDING_CACHE_SIZE", default="10000")))
+    
+    def _uses_table(self, db: Session) -> bool:
+        return db.get_bind().dialect.name == "postgresql"
+    
+    def get_many(self, db: Session, model_name: str, hashes: Iterable[str]) -> Dict[str, np.ndarray]:
+        """
+        Look up cached embeddings; returns only the hashes that were found.
+        model_name is embedding_service.cache_key, which also names the runtime.
+        """
+        if not self.enabled:
+            return {}
+        
+        found = {}
+        missing = []
+        for digest in dict.fromkeys(hashes):
+            embedding = self.memory.get((model_name, digest))
+            if embedding is None:
+                missing.append(digest)
+            else:
+                found[digest] = embedding
+        
+        if missing and self._uses_table(db):
+            result = db.execute(
+                text("""
+                    SELECT content_hash, embedding::text AS embedding
+                    FROM embedding_cache
+                    WHERE model_name = :model_name AND content_hash = ANY(:hashes)
+                """),
+                {"model_name": model_name, "hashes": missing}
+            )
+            for row in result.fetchall():
+                embedding = parse_vector(row.embedding)
+                self.memory.put((model_name, row.content_hash), embedding)
+                found[row.content_hash] = embedding
+        
+        return found
+    
+    def put_many(self, db: Session, model_name: str, embeddings: Dict[str, np.ndarray]) -> None:
+        """Store freshly computed embeddings in both cache layers"""
+        if not self.enabled or not embeddings:
+            return
+        
+        for digest, embedding in embeddings.items():
+            self.memory.put((model_name, digest), embedding)
+        
+        if self._uses_table(db):
+            placeholders = []
+            params = {"model_name": model_name}
+            for i, (digest, embedding) in enumerate(embeddings.items()):
+                placeholders.append(f"(:model_name, :hash_{i}, CAST(:embedding_{i} AS vector))")
+                params[f"hash_{i}"] = digest
+                params[f"embedding_{i}"] = vector_literal(embedding)
+            
+            db.execute(
+                text(f"""
+                    INSERT INTO embedding_cache (model_name, content_hash, embedding)
+                    VALUES {", ".join(placeholders)}
+                    ON CONFLICT (model_name, content_hash) DO NOTHING
+                """),
+                params
+            )
+
+# Global embedding cache service instance
+embedding_cache_service = EmbeddingCacheService()
@@ -1,34 +1,334 @@
 import os
-from typing import List, Dict, Any
-from sentence_transformers import SentenceTransformer
+import asyncio
+import threading
+from typing import List, Dict, Any, Callable, Optional, Set, Tuple
 import numpy as np
 from decouple import config
+from app.core.cache import LRUCache
+from app.services.executor_service import executor_service
+from app.services.embedding_sidecar import EmbeddingSidecarClient, DEFAULT_SOCKET_PATH
+
+EMBEDDING_RUNTIMES = ("torch", "int8", "onnx")
+
+def load_sentence_transformer(model_name: str, runtime: str = "torch", onnx_file: Optional[str] = None):
+    """
+    Load a SentenceTransformer for CPU inference with the given runtime.
+    
+    torch is the dense fp32 PyTorch model. int8 applies PyTorch dynamic
+    quantization to every Linear layer. onnx runs the model with ONNX Runtime
+    (requires optimum[onnxruntime]); onnx_file selects a specific export such
+    as onnx/model_qint8_avx512_vnni.onnx.
+    """
+    from sentence_transformers import SentenceTransformer
+    if runtime == "torch":
+        return SentenceTransformer(model_name)
+    if runtime == "int8":
+        import torch
+        model = SentenceTransformer(model_name, device="cpu")
+        return torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    if runtime == "onnx":
+        model_kwargs = {"file_name": onnx_file} if onnx_file else None
+        return SentenceTransformer(model_name, backend="onnx", model_kwargs=model_kwargs)
+    raise ValueError(f"Unknown EMBEDDING_RUNTIME: {runtime}")
+
+def cosine_agreement(embeddings: np.ndarray, reference: np.ndarray) -> Dict[str, float]:
+    """Row-wise cosine similarity between two embedding matrices of the same texts"""
+    embeddings = np.asarray(embeddings, dtype=np.float32)
+    reference = np.asarray(reference, dtype=np.float32)
+    dots = np.einsum("ij,ij->i", embeddings, reference)
+    norms = np.linalg.norm(embeddings, axis=1) * np.linalg.norm(reference, axis=1)
+    cosines = dots / np.maximum(norms, np.finfo(np.float32).tiny)
+    return {
+        "mean_cosine": round(float(cosines.mean()), 6),
+        "min_cosine": round(float(cosines.min()), 6),
+        "p05_cosine": round(float(np.percentile(cosines, 5)), 6)
+    }
+
+def normalize_embeddings(embeddings, copy: bool = True) -> np.ndarray:
+    """L2-normalize float32 embeddings along the last axis; zero vectors stay zero"""
+    embeddings = np.array(embeddings, dtype=np.float32, copy=copy)
+    norms = np.linalg.norm(embeddings, axis=-1, keepdims=True)
+    np.divide(embeddings, norms, out=embeddings, where=norms > 0)
+    return embeddings
+
+def top_k_indices(scores: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Indices and values of the k highest scores along the last axis, best first.
+    
+    argpartition selects the top k in O(N); only those k are then sorted.
+    """
+    scores = np.asarray(scores)
+    n = scores.shape[-1]
+    k = max(0, min(k, n))
+    if k == 0:
+        empty = np.empty(scores.shape[:-1] + (0,))
+        return empty.astype(np.intp), empty.astype(scores.dtype)
+    
+    if k < n:
+        candidates = np.argpartition(scores, n - k, axis=-1)[..., n - k:]
+    else:
+        candidates = np.broadcast_to(np.arange(n), scores.shape)
+    candidate_scores = np.take_along_axis(scores, candidates, axis=-1)
+    order = np.argsort(-candidate_scores, axis=-1, kind="stable")
+    return np.take_along_axis(candidates, order, axis=-1), np.take_along_axis(candidate_scores, order, axis=-1)
+
+def normalize_query(text: str) -> str:
+    """Normalize query text so trivially different phrasings share a cache entry"""
+    return " ".join(text.split()).lower()
+
+class EmbeddingBatcher:
+    """
+    Asyncio micro-batcher for embedding requests.
+    
+    Requests are collected until max_batch_size texts are waiting or
+    max_wait_ms has passed since the first one arrived, then encoded with one
+    batched call off the event loop. Each caller awaits its own future.
+    """
+    
+    def __init__(self, encode: Callable[[List[str]], np.ndarray], max_batch_size: int, max_wait_ms: float):
+        self._encode = encode
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000
+        self.batches = 0
+        self.items = 0
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._pending: List[Tuple[str, asyncio.Future]] = []
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self._tasks: Set[asyncio.Task] = set()
+    
+    async def embed(self, text: str) -> np.ndarray:
+        """Queue a text for the next batch and wait for its embedding"""
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            # State from a previous event loop cannot be reused
+            self._loop = loop
+            self._pending = []
+            self._flush_handle = None
+        
+        future = loop.create_future()
+        self._pending.append((text, future))
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(self.max_wait, self._flush)
+        return await future
+    
+    def _flush(self) -> None:
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        batch, self._pending = self._pending, []
+        if batch:
+            task = self._loop.create_task(self._run_batch(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+    
+    async def _run_batch(self, batch: List[Tuple[str, asyncio.Future]]) -> None:
+        self.batches += 1
+        self.items += len(batch)
+        try:
+            embeddings = await self._loop.run_in_executor(executor_service.thread_pool, self._encode, [text for text, _ in batch])
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (_, future), embedding in zip(batch, embeddings):
+            if not future.done():
+                future.set_result(embedding)
+    
+    def stats(self) -> Dict[str, Any]:
+        """Get batch counters"""
+        return {
+            "batches": self.batches,
+            "items": self.items,
+            "avg_batch_size": round(self.items / self.batches, 2) if self.batches else 0.0
+        }
 
 class EmbeddingService:
-    """Service for generating text embeddings"""
+    """
+    Service for generating text embeddings.
+    
+    The SentenceTransformer model is loaded on first use, or ahead of time by
+    start_warmup() in a background thread, so importing this module stays
+    cheap. With EMBEDDING_BACKEND=sidecar the model lives in a separate
+    process shared by all API workers and texts are embedded over a Unix
+    socket instead.
+    """
     
     def __init__(self):
         # Use a lightweight but effective embedding model
         self.model_name = config("EMBEDDING_MODEL", default="all-MiniLM-L6-v2")
-        self.model = SentenceTransformer(self.model_name)
-        self.dimension = self.model.get_sentence_embedding_dimension()
+        self.preload = config("EMBEDDING_PRELOAD", default="true").lower() == "true"
+        self.runtime = config("EMBEDDING_RUNTIME", default="torch").lower()
+        if self.runtime not in EMBEDDING_RUNTIMES:
+            raise ValueError(f"Unknown EMBEDDING_RUNTIME: {self.runtime}")
+        self.onnx_file = config("EMBEDDING_ONNX_FILE", default="") or None
+        self.backend = config("EMBEDDING_BACKEND", default="local").lower()
+        if self.backend not in ("local", "sidecar"):
+            raise ValueError(f"Unknown EMBEDDING_BACKEND: {self.backend}")
+        self.sidecar = None
+        if self.backend == "sidecar":
+            self.sidecar = EmbeddingSidecarClient(
+                config("EMBEDDING_SIDECAR_SOCKET", default=DEFAULT_SOCKET_PATH),
+                timeout=float(config("EMBEDDING_SIDECAR_TIMEOUT", default="60"))
+            )
+        self._sidecar_info: Optional[Dict[str, Any]] = None
+        self._tokenizer = None
+        self._model = None
+        self._load_lock = threading.Lock()
+        self._ready = threading.Event()
+        self._load_error: Optional[str] = None
+        self.query_cache = LRUCache(
+            int(config("QUERY_CACHE_SIZE", default="1024")),
+            ttl_seconds=float(config("QUERY_CACHE_TTL_SECONDS", default="3600"))
+        )
+        self.microbatch_enabled = config("EMBEDDING_MICROBATCH", default="true").lower() == "true"
+        self.batcher = EmbeddingBatcher(
+            self.encode_array,
+            max_batch_size=int(config("EMBEDDING_MICROBATCH_MAX_SIZE", default="32")),
+            max_wait_ms=float(config("EMBEDDING_MICROBATCH_MAX_WAIT_MS", default="5"))
+        )
+    
+    @property
+    def model(self):
+        """The SentenceTransformer model, loaded on first access"""
+        if self._model is None:
+            with self._load_lock:
+                if self._model is None:
+                    self._model = load_sentence_transformer(self.model_name, self.runtime, self.onnx_file)
+        return self._model
+    
+    @property
+    def sidecar_info(self) -> Dict[str, Any]:
+        """Model details reported by the sidecar, fetched once"""
+        if self._sidecar_info is None:
+            self._sidecar_info = self.sidecar.info()
+        return self._sidecar_info
+    
+    @property
+    def cache_key(self) -> str:
+        """
+        Identifies the vectors this service produces in the embedding and query
+        caches: the model name, qualified by the runtime and ONNX file unless it
+        is the reference torch runtime, so switching runtimes never serves
+        vectors another runtime produced
+        """
+        if self.sidecar is not None:
+            info = self.sidecar_info
+            model_name, runtime, onnx_file = info["model"], info.get("runtime", "torch"), info.get("onnx_file")
+        else:
+            model_name, runtime, onnx_file = self.model_name, self.runtime, self.onnx_file
+        if runtime == "torch":
+            return model_name
+        return f"{model_name}:{runtime}" + (f":{onnx_file}" if runtime == "onnx" and onnx_file else "")
+    
+    @property
+    def dimension(self) -> int:
+        if self.sidecar is not None:
+            return self.sidecar_info["dimension"]
+        return self.model.get_sentence_embedding_dimension()
+    
+    def _encode(self, texts: List[str]) -> np.ndarray:
+        """Embed texts with the configured backend as a float32 matrix"""
+        if self.sidecar is not None:
+            embeddings = self.sidecar.encode(texts)
+        else:
+            embeddings = self.model.encode(texts, convert_to_numpy=True)
+        self._load_error = None  # A failed warm-up is moot once an encode succeeds
+        self._ready.set()
+        return embeddings
+    
+    def start_warmup(self) -> None:
+        """Load the model and run one encode in a background thread"""
+        threading.Thread(target=self._warm_up, name="embedding-warmup", daemon=True).start()
+    
+    def _warm_up(self) -> None:
+        try:
+            self._encode(["warm-up"])
+        except Exception as e:
+            self._load_error = str(e)
+    
+    def is_ready(self) -> bool:
+        """Whether the model is loaded and has served at least one encode"""
+        return self._ready.is_set()
+    
+    def get_status(self) -> Dict[str, Any]:
+        """Get model readiness for health checks"""
+        return {
+            "ready": self.is_ready(),
+            "model": self.model_name,
+            "backend": self.backend,
+            "runtime": self.runtime,
+            "error": self._load_error,
+            "query_cache": self.query_cache.stats(),
+            "microbatch": self.batcher.stats()
+        }
+    
+    def encode_array(self, texts: List[str]) -> np.ndarray:
+        """Generate embeddings as one contiguous float32 (len(texts), dimension) array"""
+        try:
+            return np.ascontiguousarray(self._encode(texts), dtype=np.float32)
+        except Exception as e:
+            raise Exception(f"Error generating embeddings: {str(e)}")
     
     def generate_embeddings(self, texts: List[str]) -> List[List[float]]:
         """Generate embeddings for a list of texts"""
         try:
-            embeddings = self.model.encode(texts, convert_to_tensor=False)
-            return embeddings.tolist()
+            return self._encode(texts).tolist()
         except Exception as e:
             raise Exception(f"Error generating embeddings: {str(e)}")
     
     def generate_single_embedding(self, text: str) -> List[float]:
         """Generate embedding for a single text"""
         try:
-            embedding = self.model.encode([text], convert_to_tensor=False)
-            return embedding[0].tolist()
+            return self._encode([text])[0].tolist()
         except Exception as e:
             raise Exception(f"Error generating embedding: {str(e)}")
     
+    def embed_query(self, text: str) -> np.ndarray:
+        """Embed a search query as a float32 vector, serving repeated queries from the query cache"""
+        key = (self.cache_key, normalize_query(text))
+        embedding = self.query_cache.get(key)
+        if embedding is None:
+            embedding = self.encode_array([text])[0]
+            self.query_cache.put(key, embedding)
+        return embedding
+    
+    async def aembed_query(self, text: str) -> np.ndarray:
+        """
+        Embed a search query without blocking the event loop.
+        
+        Cache misses from concurrent callers are coalesced by the micro-batcher
+        into a single batched encode.
+        """
+        key = (self.cache_key, normalize_query(text))
+        embedding = self.query_cache.get(key)
+        if embedding is None:
+            if self.microbatch_enabled:
+                embedding = await self.batcher.embed(text)
+            else:
+                embedding = (await executor_service.run_in_thread(self.encode_array, [text]))[0]
+            self.query_cache.put(key, embedding)
+        return embedding
+    
+    def check_parity(self, texts: List[str]) -> Dict[str, Any]:
+        """
+        Compare this service's embeddings with the dense fp32 PyTorch model.
+        
+        Loads a separate fp32 reference model, embeds texts with both and
+        reports how closely the vectors agree. Agreement is 1.0 for the torch
+        runtime; quantized runtimes typically stay above 0.99.
+        """
+        reference_model = load_sentence_transformer(self.model_name, "torch")
+        reference = reference_model.encode(texts, convert_to_numpy=True)
+        return {
+            "model": self.model_name,
+            "runtime": self.runtime,
+            "texts": len(texts),
+            **cosine_agreement(self._encode(texts), reference)
+        }
+    
     def similarity(self, embedding1: List[float], embedding2: List[float]) -> float:
         """Calculate cosine similarity between two embeddings"""
         try:
@@ -38,9 +338,54 @@ class EmbeddingService:
         except Exception as e:
             raise Exception(f"Error calculating similarity: {str(e)}")
     
+    def normalize(self, embeddings) -> np.ndarray:
+        """Return L2-normalized float32 copies, ready for similarity_matrix(normalized=True)"""
+        return normalize_embeddings(embeddings)
+    
+    def similarity_matrix(self, queries, candidates, normalized: bool = False) -> np.ndarray:
+        """
+        Cosine similarity of one query (d,) against candidates (N, d), giving
+        (N,), or of M queries (M, d) against N candidates, giving (M, N).
+        
+        Scoring is a single float32 matrix multiply. Pass normalized=True when
+        both sides were already normalized, e.g. a candidate matrix prepared
+        once with normalize(), to skip the per-call normalization.
+        """
+        try:
+            if normalized:
+                queries = np.asarray(queries, dtype=np.float32)
+                candidates = np.asarray(candidates, dtype=np.float32)
+            else:
+                queries = normalize_embeddings(queries)
+                candidates = normalize_embeddings(candidates)
+            return candidates @ queries if queries.ndim == 1 else queries @ candidates.T
+        except Exception as e:
+            raise Exception(f"Error calculating similarity: {str(e)}")
+    
+    def top_k(self, queries, candidates, k: int, normalized: bool = False) -> Tuple[np.ndarray, np.ndarray]:
+        """Indices and cosine scores of the k most similar candidates per query, best first"""
+        return top_k_indices(self.similarity_matrix(queries, candidates, normalized), k)
+    
     def get_dimension(self) -> int:
         """Get the dimension of the embeddings"""
         return self.dimension
+    
+    def get_max_seq_length(self) -> int:
+        """Get the number of tokens the model embeds before truncating"""
+        if self.sidecar is not None:
+            return self.sidecar_info["max_seq_length"]
+        return self.model.max_seq_length
+    
+    def get_tokenizer(self):
+        """Get the model's own tokenizer; in sidecar mode only the tokenizer is loaded here"""
+        if self.sidecar is None:
+            return self.model.tokenizer
+        if self._tokenizer is None:
+            with self._load_lock:
+                if self._tokenizer is None:
+                    from transformers import AutoTokenizer
+                    self._tokenizer = AutoTokenizer.from_pretrained(self.sidecar_info["tokenizer"])
+        return self._tokenizer
 
 # Global embedding service instance
 embedding_service = EmbeddingService()
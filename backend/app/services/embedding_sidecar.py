@@ -0,0 +1,235 @@
+"""
+Embedding sidecar: one local process owns the SentenceTransformer model and
+serves embeddings to the API workers over a Unix domain socket.
+
+Run it next to uvicorn and point the workers at it:
+
+    python -m app.services.embedding_sidecar
+    EMBEDDING_BACKEND=sidecar uvicorn app.main:app --workers 4
+
+Wire format (all integers big-endian):
+
+    request:  op (uint8), payload length (uint32), payload
+    response: status (uint8), payload length (uint32), payload
+
+An ENCODE payload is a uint32 text count followed by a uint32 length and the
+UTF-8 bytes of each text. Its response payload is the row and column counts
+(uint32 each) followed by the embeddings as little-endian float32. INFO has an
+empty payload and answers with a small JSON object describing the model. An
+error response carries the UTF-8 error message.
+"""
+
+import os
+import json
+import socket
+import struct
+import asyncio
+import threading
+from typing import Any, Dict, List, Optional
+import numpy as np
+from decouple import config
+
+OP_ENCODE = 1
+OP_INFO = 2
+
+STATUS_OK = 0
+STATUS_ERROR = 1
+
+FRAME_HEADER = struct.Struct("!BI")
+COUNT = struct.Struct("!I")
+SHAPE = struct.Struct("!II")
+VECTOR_DTYPE = np.dtype("<f4")
+
+DEFAULT_SOCKET_PATH = "/tmp/rag-embedding.sock"
+
+def encode_texts(texts: List[str]) -> bytes:
+    """Pack texts into an ENCODE payload"""
+    parts = [COUNT.pack(len(texts))]
+    for text in texts:
+        data = text.encode("utf-8")
+        parts.append(COUNT.pack(len(data)))
+        parts.append(data)
+    return b"".join(parts)
+
+def decode_texts(payload: bytes) -> List[str]:
+    """Unpack the texts of an ENCODE payload"""
+    (count,) = COUNT.unpack_from(payload, 0)
+    offset = COUNT.size
+    texts = []
+    for _ in range(count):
+        (length,) = COUNT.unpack_from(payload, offset)
+        offset += COUNT.size
+        texts.append(payload[offset:offset + length].decode("utf-8"))
+        offset += length
+    return texts
+
+def encode_matrix(embeddings: np.ndarray) -> bytes:
+    """Pack a 2-D embedding matrix into an ENCODE response payload"""
+    matrix = np.ascontiguousarray(embeddings, dtype=VECTOR_DTYPE)
+    rows, dim = matrix.shape
+    return SHAPE.pack(rows, dim) + matrix.tobytes()
+
+def decode_matrix(payload: bytes) -> np.ndarray:
+    """Unpack an ENCODE response payload into a float32 matrix"""
+    rows, dim = SHAPE.unpack_from(payload, 0)
+    return np.frombuffer(payload, dtype=VECTOR_DTYPE, count=rows * dim, offset=SHAPE.size).reshape(rows, dim)
+
+class EmbeddingSidecarClient:
+    """
+    Blocking client for the embedding sidecar.
+    
+    Each thread keeps its own connection, so the shared thread pool can issue
+    requests concurrently; the sidecar batches them together.
+    """
+    
+    def __init__(self, socket_path: str, timeout: float = 60.0):
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self._local = threading.local()
+    
+    def _connection(self) -> socket.socket:
+        sock = getattr(self._local, "sock", None)
+        if sock is None:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(self.timeout)
+            sock.connect(self.socket_path)
+            self._local.sock = sock
+        return sock
+    
+    def _close(self) -> None:
+        sock = getattr(self._local, "sock", None)
+        if sock is not None:
+            sock.close()
+            self._local.sock = None
+    
+    def _recv_exactly(self, sock: socket.socket, size: int) -> bytes:
+        buffer = bytearray(size)
+        view = memoryview(buffer)
+        received = 0
+        while received < size:
+            n = sock.recv_into(view[received:])
+            if n == 0:
+                raise ConnectionError("Embedding sidecar closed the connection")
+            received += n
+        return bytes(buffer)
+    
+    def _request(self, op: int, payload: bytes = b"") -> bytes:
+        # A stale connection (e.g. after a sidecar restart) is retried once
+        for attempt in range(2):
+            try:
+                sock = self._connection()
+                sock.sendall(FRAME_HEADER.pack(op, len(payload)) + payload)
+                status, length = FRAME_HEADER.unpack(self._recv_exactly(sock, FRAME_HEADER.size))
+                body = self._recv_exactly(sock, length)
+                break
+            except OSError:
+                self._close()
+                if attempt:
+                    raise
+        if status != STATUS_OK:
+            raise RuntimeError(body.decode("utf-8", errors="replace"))
+        return body
+    
+    def encode(self, texts: List[str]) -> np.ndarray:
+        """Embed texts in the sidecar; returns a float32 matrix with one row per text"""
+        if not texts:
+            return np.empty((0, 0), dtype=VECTOR_DTYPE)
+        return decode_matrix(self._request(OP_ENCODE, encode_texts(texts)))
+    
+    def info(self) -> Dict[str, Any]:
+        """Describe the sidecar's model: name, dimension, max_seq_length and tokenizer"""
+        return json.loads(self._request(OP_INFO).decode("utf-8"))
+
+class EmbeddingSidecarServer:
+    """
+    Unix socket server that owns the embedding model.
+    
+    Texts from all connections go through one EmbeddingBatcher, so requests
+    from different API workers that arrive together share a single encode.
+    """
+    
+    def __init__(
+        self,
+        socket_path: str,
+        model_name: str,
+        runtime: str = "torch",
+        onnx_file: Optional[str] = None,
+        max_batch_size: int = 64,
+        max_wait_ms: float = 5
+    ):
+        from app.services.embedding_service import EmbeddingBatcher, load_sentence_transformer
+        
+        self.socket_path = socket_path
+        self.model_name = model_name
+        self.runtime = runtime
+        self.onnx_file = onnx_file
+        self.model = load_sentence_transformer(model_name, runtime, onnx_file)
+        self.model.encode(["warm-up"], convert_to_tensor=False)
+        self.batcher = EmbeddingBatcher(self._encode, max_batch_size, max_wait_ms)
+    
+    def _encode(self, texts: List[str]) -> np.ndarray:
+        return self.model.encode(texts, convert_to_numpy=True)
+    
+    def info(self) -> Dict[str, Any]:
+        return {
+            "model": self.model_name,
+            "runtime": self.runtime,
+            "onnx_file": self.onnx_file,
+            "dimension": self.model.get_sentence_embedding_dimension(),
+            "max_seq_length": self.model.max_seq_length,
+            "tokenizer": self.model.tokenizer.name_or_path
+        }
+    
+    async def _handle(self, op: int, payload: bytes) -> bytes:
+        if op == OP_INFO:
+            return json.dumps(self.info()).encode("utf-8")
+        if op == OP_ENCODE:
+            texts = decode_texts(payload)
+            rows = await asyncio.gather(*(self.batcher.embed(text) for text in texts))
+            return encode_matrix(np.stack(rows))
+        raise ValueError(f"Unknown op {op}")
+    
+    async def _serve_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                try:
+                    op, length = FRAME_HEADER.unpack(await reader.readexactly(FRAME_HEADER.size))
+                    payload = await reader.readexactly(length)
+                except asyncio.IncompleteReadError:
+                    break
+                try:
+                    status, body = STATUS_OK, await self._handle(op, payload)
+                except Exception as e:
+                    status, body = STATUS_ERROR, f"Error generating embeddings: {str(e)}".encode("utf-8")
+                writer.write(FRAME_HEADER.pack(status, len(body)) + body)
+                await writer.drain()
+        finally:
+            writer.close()
+    
+    async def serve_forever(self) -> None:
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        server = await asyncio.start_unix_server(self._serve_connection, path=self.socket_path)
+        print(f"✅ Embedding sidecar serving {self.model_name} ({self.runtime}) on {self.socket_path}")
+        async with server:
+            await server.serve_forever()
+
+def main(socket_path: Optional[str] = None) -> None:
+    server = EmbeddingSidecarServer(
+        socket_path or config("EMBEDDING_SIDECAR_SOCKET", default=DEFAULT_SOCKET_PATH),
+        config("EMBEDDING_MODEL", default="all-MiniLM-L6-v2"),
+        runtime=config("EMBEDDING_RUNTIME", default="torch").lower(),
+        onnx_file=config("EMBEDDING_ONNX_FILE", default="") or None,
+        max_batch_size=int(config("EMBEDDING_SIDECAR_MAX_BATCH_SIZE", default="64")),
+        max_wait_ms=float(config("EMBEDDING_MICROBATCH_MAX_WAIT_MS", default="5"))
+    )
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if os.path.exists(server.socket_path):
+            os.unlink(server.socket_path)
+
+if __name__ == "__main__":
+    main()
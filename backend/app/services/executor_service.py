@@ -0,0 +1,70 @@
+import os
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from threading import Lock
+from typing import Any, Callable, Optional
+from decouple import config
+
+class ExecutorService:
+    """
+    Shared executors for work that must not run on the event loop.
+    
+    The thread pool runs calls that release the GIL or block on I/O: model
+    encodes, database work and the ingest pipeline that drives them. The
+    process pool runs pure-Python parsing and chunking, which would otherwise
+    hold the GIL. Both pools are created on first use.
+    """
+    
+    def __init__(self):
+        self.thread_workers = int(config("EXECUTOR_THREAD_WORKERS", default="8"))
+        self.process_workers = int(config("EXECUTOR_PROCESS_WORKERS", default=str(os.cpu_count() or 1)))
+        self._thread_pool: Optional[ThreadPoolExecutor] = None
+        self._process_pool: Optional[ProcessPoolExecutor] = None
+        self._lock = Lock()
+    
+    @property
+    def thread_pool(self) -> ThreadPoolExecutor:
+        if self._thread_pool is None:
+            with self._lock:
+                if self._thread_pool is None:
+                    self._thread_pool = ThreadPoolExecutor(
+                        max_workers=self.thread_workers, thread_name_prefix="blocking"
+                    )
+        return self._thread_pool
+    
+    @property
+    def process_pool(self) -> ProcessPoolExecutor:
+        if self._process_pool is None:
+            with self._lock:
+                if self._process_pool is None:
+                    # Spawned workers do not inherit the model or threads of this process
+                    self._process_pool = ProcessPoolExecutor(
+                        max_workers=self.process_workers,
+                        mp_context=multiprocessing.get_context("spawn")
+                    )
+        return self._process_pool
+    
+    async def run_in_thread(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """Run a blocking call in the thread pool and await its result"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.thread_pool, partial(fn, *args, **kwargs))
+    
+    async def run_in_process(self, fn: Callable[..., Any], *args) -> Any:
+        """Run a picklable CPU-bound call in the process pool and await its result"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.process_pool, fn, *args)
+    
+    def shutdown(self) -> None:
+        """Stop both pools"""
+        with self._lock:
+            if self._thread_pool is not None:
+                self._thread_pool.shutdown(wait=False, cancel_futures=True)
+                self._thread_pool = None
+            if self._process_pool is not None:
+                self._process_pool.shutdown(wait=False, cancel_futures=True)
+                self._process_pool = None
+
+# Global executor service instance
+executor_service = ExecutorService()
@@ -0,0 +1,387 @@
+import os
+import threading
+from datetime import datetime
+from typing import List, Dict, Any, Iterable, Iterator, Optional, Tuple
+from uuid import UUID, uuid4
+import numpy as np
+import faiss
+from sqlalchemy import select, insert, update, delete, func
+from sqlalchemy.orm import Session
+from decouple import config
+from app.core.cache import LRUCache
+from app.db.models.document_chunk import DocumentChunk
+from app.services.document_catalog_service import document_catalog_service
+from app.services.embedding_service import embedding_service, normalize_embeddings
+from app.services.vector_store_base import VectorStoreService
+from app.services.vector_shards import VectorShard, shard_dir_name
+
+def vector_id_for(chunk_id: str) -> int:
+    """Positive int64 FAISS id derived from a chunk's UUID"""
+    return UUID(chunk_id).int >> 65
+
+class FaissStoreService(VectorStoreService):
+    """
+    Local vector store searched with FAISS.
+    
+    Chunk text, metadata and the raw embeddings live in the document_chunk
+    table. Each user's normalized vectors are also persisted as a
+    memory-mapped shard under VECTOR_STORE_DIR, so restarts do not re-read
+    embeddings from the database and only active users' pages are resident.
+    Searches are exact inner-product scans (cosine similarity) over the
+    shard. Shards are changed only after each write has committed: appends
+    are incremental and deletes compact the shard. A shard whose row count
+    disagrees with the database, e.g. after a crash, is rebuilt from it.
+    """
+    
+    def __init__(self):
+        super().__init__()
+        self.store_dir = config("VECTOR_STORE_DIR", default="./vector_store")
+        self._shards = LRUCache(int(config("VECTOR_STORE_OPEN_SHARDS", default="256")))
+        self._verified = LRUCache(int(config("VECTOR_STORE_OPEN_SHARDS", default="256")))
+        self._lock = threading.Lock()
+    
+    def _shard(self, user_id: str) -> VectorShard:
+        """The user's shard handle; opening it does not touch the database"""
+        with self._lock:
+            shard = self._shards.get(user_id)
+            if shard is None:
+                shard = VectorShard(os.path.join(self.store_dir, shard_dir_name(user_id)))
+                self._shards.put(user_id, shard)
+            return shard
+    
+    def _get_shard(self, db: Session, user_id: str) -> VectorShard:
+        """
+        The user's shard for searching. The first time this process opens it
+        the row count is checked against the database, rebuilding on mismatch.
+        The shard's exclusive lock is held from the count to the end of the
+        rebuild, so a concurrent post-commit append either lands before the
+        check or waits and is then skipped if the rebuild already has it.
+        """
+        shard = self._shard(user_id)
+        if self._verified.get(user_id) is None:
+            with shard.exclusive():
+                total = db.execute(
+                    select(func.count()).select_from(DocumentChunk).where(DocumentChunk.user_id == user_id)
+                ).scalar()
+                if total != shard.count():
+                    self._rebuild_shard(db, user_id, shard)
+            self._verified.put(user_id, True)
+        return shard
+    
+    def _rebuild_shard(self, db: Session, user_id: str, shard: VectorShard) -> None:
+        """Rewrite the user's shard from the embeddings stored in the database; callers hold its lock"""
+        rows = db.execute(
+            select(DocumentChunk.vector_id, DocumentChunk.embedding).where(DocumentChunk.user_id == user_id)
+        ).all()
+        if not rows:
+            if shard.exists():
+                shard.rebuild(np.empty(0, dtype=np.int64), np.empty((0, 0), dtype=np.float32), shard.dimension())
+            return
+        vectors = np.frombuffer(b"".join(row.embedding for row in rows), dtype=np.float32).reshape(len(rows), -1)
+        shard.rebuild(
+            np.array([row.vector_id for row in rows], dtype=np.int64),
+            normalize_embeddings(vectors),
+            vectors.shape[1]
+        )
+    
+    def _update_shard(
+        self,
+        user_id: str,
+        vector_ids: List[int],
+        vectors: List[np.ndarray],
+        removed_vector_ids: Iterable[int] = ()
+    ) -> None:
+        """Apply committed changes to the user's shard"""
+        shard = self._shard(user_id)
+        shard.remove(removed_vector_ids)
+        if vector_ids:
+            shard.append(np.array(vector_ids, dtype=np.int64), normalize_embeddings(np.vstack(vectors)))
+    
+    def _insert_chunks(
+        self,
+        db: Session,
+        documents: Iterable[Dict[str, Any]],
+        user_id: str,
+        embed_stats: Dict[str, Any]
+    ) -> Tuple[List[str], List[int], List[np.ndarray]]:
+        """
+        Embed and insert chunks, adding them to the document catalog; returns
+        their ids, FAISS ids and embedding batches
+        """
+        document_ids = []
+        vector_ids = []
+        vectors = []
+        summaries: Dict[str, Dict[str, Any]] = {}
+        documents = document_catalog_service.tally(documents, summaries)
+        for batch, embeddings in self._embedded_batches(db, documents, embed_stats):
+            rows = [self._build_row(doc, embedding, user_id) for doc, embedding in zip(batch, embeddings)]
+            db.execute(insert(DocumentChunk), rows)
+            document_ids.extend(row["id"] for row in rows)
+            vector_ids.extend(row["vector_id"] for row in rows)
+            vectors.append(embeddings)
+        document_catalog_service.add_chunks(db, user_id, summaries)
+        return document_ids, vector_ids, vectors
+    
+    def _build_row(self, doc: Dict[str, Any], embedding: np.ndarray, user_id: str) -> Dict[str, Any]:
+        """Build a document_chunk row for a chunk"""
+        metadata = self._chunk_metadata(doc)
+        chunk_id = str(uuid4())
+        return {
+            "id": chunk_id,
+            "vector_id": vector_id_for(chunk_id),
+            "user_id": user_id,
+            "document_id": metadata["document_id"],
+            "chunk_index": metadata["chunk_index"],
+            "title": metadata["title"],
+            "source": metadata["source"],
+            "token_count": metadata["token_count"],
+            "content": doc["content"],
+            "content_hash": metadata["content_hash"],
+            "file_hash": metadata.get("file_hash"),
+            "meta": metadata,
+            "embedding": np.ascontiguousarray(embedding, dtype=np.float32).tobytes(),
+            "created_at": datetime.fromisoformat(doc["created_at"]) if doc.get("created_at") else datetime.now()
+        }
+    
+    def add_documents(
+        self,
+        db: Session,
+        documents: Iterable[Dict[str, Any]],
+        user_id: str,
+        stats: Optional[Dict[str, Any]] = None,
+        commit: bool = True
+    ) -> List[str]:
+        """
+        Add documents to the FAISS store.
+        
+        documents may be a stream and is embedded in windows like the pgvector
+        store. With commit=False the caller owns the transaction, so the user's
+        shard is dropped and rebuilt from the database on the next search.
+        """
+        try:
+            embed_stats = {"embedded_chunks": 0, "embedding_seconds": 0.0, "cache_hits": 0}
+            document_ids, vector_ids, vectors = self._insert_chunks(db, documents, user_id, embed_stats)
+            
+            if commit:
+                db.commit()
+                self._update_shard(user_id, vector_ids, vectors)
+            else:
+                self.invalidate(user_id)
+            
+            self._record_embedding_stats(stats, embed_stats, len(document_ids))
+            return document_ids
+        
+        except Exception as e:
+            db.rollback()
+            raise Exception(f"Error adding documents to FAISS: {str(e)}")
+    
+    def search_documents(
+        self,
+        db: Session,
+        query: str,
+        user_id: str,
+        n_results: int = 5,
+        similarity_threshold: float = 0.5,
+        query_embedding: Optional[np.ndarray] = None,
+        mode: Optional[str] = None,
+        filters: Optional[Dict[str, Any]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Search the user's shard; query_embedding skips embedding the query.
+        There is no full-text index, so every mode runs as a vector search.
+        
+        filters (document_ids, sources, created_after) select the matching
+        chunks' ids in SQL, and only those rows of the shard are scanned.
+        """
+        try:
+            vectors, vector_ids = self._get_shard(db, user_id).snapshot()
+            filters = self.normalize_filters(filters)
+            if filters and len(vector_ids):
+                matching = self._filtered_vector_ids(db, user_id, filters)
+                keep = np.isin(vector_ids, matching)
+                vectors, vector_ids = vectors[keep], vector_ids[keep]
+            if len(vector_ids) == 0:
+                return []
+            
+            if query_embedding is None:
+                query_embedding = embedding_service.embed_query(query)
+            
+            query_vector = normalize_embeddings(query_embedding).reshape(1, -1)
+            scores, rows = faiss.knn(
+                query_vector, vectors, min(n_results, len(vector_ids)), metric=faiss.METRIC_INNER_PRODUCT
+            )
+            hits = [
+                (int(vector_ids[row]), float(score))
+                for row, score in zip(rows[0], scores[0])
+                if row != -1 and score > similarity_threshold
+            ]
+            if not hits:
+                return []
+            
+            rows = db.execute(
+                select(DocumentChunk).where(DocumentChunk.vector_id.in_([vector_id for vector_id, _ in hits]))
+            ).scalars().all()
+            by_vector_id = {row.vector_id: row for row in rows}
+            
+            # Format results
+            formatted_results = []
+            for vector_id, score in hits:
+                row = by_vector_id.get(vector_id)
+                if row is None:
+                    continue
+                formatted_results.append({
+                    "id": row.id,
+                    "content": row.content,
+                    "metadata": row.meta,
+                    "similarity": score
+                })
+            
+            return formatted_results
+        
+        except Exception as e:
+            raise Exception(f"Error searching documents: {str(e)}")
+    
+    def _filtered_vector_ids(self, db: Session, user_id: str, filters: Dict[str, Any]) -> np.ndarray:
+        """FAISS ids of the user's chunks that match normalized search filters"""
+        statement = select(DocumentChunk.vector_id).where(DocumentChunk.user_id == user_id)
+        if "document_ids" in filters:
+            statement = statement.where(DocumentChunk.document_id.in_(filters["document_ids"]))
+        if "sources" in filters:
+            statement = statement.where(DocumentChunk.source.in_(filters["sources"]))
+        if "created_after" in filters:
+            statement = statement.where(DocumentChunk.created_at >= filters["created_after"])
+        return np.fromiter(db.execute(statement).scalars(), dtype=np.int64)
+    
+    def reingest_document(
+        self,
+        db: Session,
+        user_id: str,
+        document_id: str,
+        documents: List[Dict[str, Any]],
+        stats: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """
+        Replace a document's chunks with a new version, touching only what
+        changed, in one transaction; see PGVectorStoreService.reingest_document.
+        """
+        try:
+            existing_rows = db.execute(
+                select(DocumentChunk.id, DocumentChunk.chunk_index, DocumentChunk.content_hash)
+                .where(DocumentChunk.user_id == user_id, DocumentChunk.document_id == document_id)
+            ).all()
+            if not existing_rows:
+                raise LookupError(f"Document {document_id} not found")
+            
+            unchanged, moved, new_documents, removed_ids = self._match_chunks(
+                ((row.id, row.chunk_index, row.content_hash) for row in existing_rows),
+                documents
+            )
+            
+            self._update_kept_chunks(db, unchanged + moved)
+            if removed_ids:
+                db.execute(delete(DocumentChunk).where(DocumentChunk.id.in_(removed_ids)))
+            
+            embed_stats = {"embedded_chunks": 0, "embedding_seconds": 0.0, "cache_hits": 0}
+            inserted_ids, vector_ids, vectors = self._insert_chunks(db, new_documents, user_id, embed_stats)
+            document_catalog_service.replace_document(
+                db, user_id, document_id, self._summarize_document(document_id, documents)
+            )
+            
+            db.commit()
+            self._update_shard(user_id, vector_ids, vectors, (vector_id_for(row_id) for row_id in removed_ids))
+            self._record_embedding_stats(stats, embed_stats, len(inserted_ids))
+            
+            return {
+                "document_id": document_id,
+                "total_chunks": len(documents),
+                "unchanged_chunks": len(unchanged),
+                "moved_chunks": len(moved),
+                "inserted_chunks": len(inserted_ids),
+                "deleted_chunks": len(removed_ids),
+                "chunk_ids": inserted_ids
+            }
+        
+        except LookupError:
+            db.rollback()
+            raise
+        except Exception as e:
+            db.rollback()
+            raise Exception(f"Error re-ingesting document: {str(e)}")
+    
+    def _update_kept_chunks(self, db: Session, kept: List[Tuple[str, Dict[str, Any]]]) -> None:
+        """Bring kept rows' chunk_index, title, source, file hash and metadata up to date with the new version"""
+        if not kept:
+            return
+        
+        updates = {}
+        for row_id, doc in kept:
+            metadata = self._chunk_metadata(doc)
+            updates[row_id] = {
+                "chunk_index": metadata["chunk_index"],
+                "title": metadata["title"],
+                "source": metadata["source"],
+                "file_hash": metadata.get("file_hash"),
+                "meta": metadata
+            }
+        
+        current = db.execute(
+            select(
+                DocumentChunk.id, DocumentChunk.chunk_index, DocumentChunk.title,
+                DocumentChunk.source, DocumentChunk.file_hash, DocumentChunk.meta
+            ).where(DocumentChunk.id.in_(list(updates)))
+        ).all()
+        changed = [
+            {"id": row.id, **updates[row.id]}
+            for row in current
+            if any(getattr(row, column) != value for column, value in updates[row.id].items())
+        ]
+        if changed:
+            db.execute(update(DocumentChunk), changed)
+    
+    def delete_user_documents(self, db: Session, user_id: str) -> bool:
+        """Delete all documents for a specific user"""
+        try:
+            db.execute(delete(DocumentChunk).where(DocumentChunk.user_id == user_id))
+            document_catalog_service.delete_user_documents(db, user_id)
+            db.commit()
+            self.invalidate(user_id)
+            return True
+        
+        except Exception as e:
+            db.rollback()
+            raise Exception(f"Error deleting user documents: {str(e)}")
+    
+    def has_chunks(self, db: Session) -> bool:
+        """Whether any user has chunks stored"""
+        return db.execute(select(DocumentChunk.id).limit(1)).first() is not None
+    
+    def document_summaries(self, db: Session) -> Iterator[Dict[str, Any]]:
+        """Catalog summaries of every stored document, aggregated from its chunks"""
+        result = db.execute(
+            select(
+                DocumentChunk.user_id,
+                DocumentChunk.document_id,
+                func.min(DocumentChunk.title).label("title"),
+                func.min(DocumentChunk.source).label("source"),
+                func.min(DocumentChunk.file_hash).label("file_hash"),
+                func.count().label("chunk_count"),
+                func.coalesce(func.sum(DocumentChunk.token_count), 0).label("token_count"),
+                func.coalesce(func.min(DocumentChunk.token_count), 0).label("min_chunk_tokens"),
+                func.coalesce(func.max(DocumentChunk.token_count), 0).label("max_chunk_tokens"),
+                func.min(DocumentChunk.created_at).label("created_at")
+            )
+            .where(DocumentChunk.document_id != "")
+            .group_by(DocumentChunk.user_id, DocumentChunk.document_id)
+        )
+        for row in result:
+            summary = dict(row._mapping)
+            summary["updated_at"] = summary["created_at"]
+            yield summary
+    
+    def invalidate(self, user_id: str) -> None:
+        """Delete the user's shard so it is rebuilt from the database on the next search"""
+        self._shard(user_id).destroy()
+        self._verified.discard(user_id)
+
+# Global FAISS store service instance
+faiss_store_service = FaissStoreService()
@@ -1,110 +1,661 @@
 import os
+import io
+import re
 import json
-from typing import List, Dict, Any, Optional
-from uuid import uuid4
+import struct
+from datetime import datetime, timedelta, timezone
+from typing import List, Dict, Any, Iterable, Iterator, Optional, Tuple
+from uuid import UUID, uuid4
 import numpy as np
 from sqlalchemy import text
 from sqlalchemy.orm import Session
 from decouple import config
+from app.core.cache import LRUCache
 from app.services.embedding_service import embedding_service
+from app.services.embedding_cache_service import content_hash, vector_literal
+from app.services.document_catalog_service import document_catalog_service
+from app.services.vector_store_base import VectorStoreService
 
-class PGVectorStoreService:
+DOCUMENT_COLUMNS = (
+    "id", "user_id", "document_id", "chunk_index", "title", "source", "token_count",
+    "content", "embedding", "metadata", "created_at"
+)
+
+# Chunk metadata stored in typed columns rather than in the metadata JSONB
+CHUNK_COLUMNS = ("document_id", "chunk_index", "title", "source", "token_count")
+
+# Columns a search reads to rebuild each result's metadata
+RESULT_COLUMNS = "id, content, metadata, document_id, chunk_index, title, source, token_count"
+
+# Keep multi-row inserts well below Postgres' 65535 bind parameter limit
+MAX_ROWS_PER_STATEMENT = 1000
+
+# Binary COPY stream header: signature, flags, header extension length
+PGCOPY_HEADER = b"PGCOPY\n\xff\r\n\x00" + struct.pack("!ii", 0, 0)
+POSTGRES_EPOCH = datetime(2000, 1, 1, tzinfo=timezone.utc)
+
+def _write_copy_field(buffer: io.BytesIO, value: Optional[bytes]) -> None:
+    """Write one length-prefixed field of a binary COPY tuple"""
+    if value is None:
+        buffer.write(struct.pack("!i", -1))
+    else:
+        buffer.write(struct.pack("!i", len(value)))
+        buffer.write(value)
+
+def _placeholder(column: str, name: str) -> str:
+    """Bind placeholder for a documents column; vectors are bound as pgvector literals"""
+    return f"CAST(:{name} AS vector)" if column == "embedding" else f":{name}"
+
+def _bind_value(column: str, row: Dict[str, Any]) -> Any:
+    value = row[column]
+    return vector_literal(value) if column == "embedding" else value
+
+def _encode_vector(embedding: np.ndarray) -> bytes:
+    """Encode an embedding in pgvector's binary format: dim, unused, big-endian float4s"""
+    values = np.asarray(embedding, dtype=">f4")
+    return struct.pack("!HH", len(values), 0) + values.tobytes()
+
+def _encode_optional_uuid(value: Optional[str]) -> Optional[bytes]:
+    return UUID(value).bytes if value else None
+
+def _encode_optional_text(value: Optional[str]) -> Optional[bytes]:
+    return value.encode("utf-8") if value is not None else None
+
+def _encode_timestamptz(value: str) -> bytes:
+    """Encode an ISO timestamp as microseconds since the Postgres epoch; naive values are local time"""
+    timestamp = datetime.fromisoformat(value)
+    if timestamp.tzinfo is None:
+        timestamp = timestamp.astimezone()
+    return struct.pack("!q", (timestamp - POSTGRES_EPOCH) // timedelta(microseconds=1))
+
+class PGVectorStoreService(VectorStoreService):
     """Service for managing vector storage and retrieval using pgvector"""
     
+    supports_lexical = True
+    
     def __init__(self):
-        self.embedding_dimension = embedding_service.get_dimension()
+        super().__init__()
+        self.insert_strategy = config("DOCUMENT_INSERT_STRATEGY", default="values")  # copy, values or row
+        # Users with fewer chunks than this are searched exactly instead of through HNSW
+        self.exact_search_threshold = int(config("EXACT_SEARCH_MAX_CHUNKS", default="20000"))
+        self.hnsw_m = int(config("HNSW_M", default="16"))
+        self.hnsw_ef_construction = int(config("HNSW_EF_CONSTRUCTION", default="64"))
+        self.hnsw_ef_search = int(config("HNSW_EF_SEARCH", default="100"))
+        self.hnsw_iterative_scan = config("HNSW_ITERATIVE_SCAN", default="relaxed_order").lower()  # off, strict_order or relaxed_order
+        # Full-text search: the content_tsv column's configuration and hybrid fusion parameters
+        self.text_search_config = config("TEXT_SEARCH_CONFIG", default="english")
+        if not re.fullmatch(r"\w+", self.text_search_config):
+            raise ValueError(f"Invalid TEXT_SEARCH_CONFIG '{self.text_search_config}'")
+        self.hybrid_candidates = int(config("HYBRID_CANDIDATES", default="50"))
+        self.rrf_k = int(config("RRF_K", default="60"))
+        self.chunk_counts = LRUCache(
+            int(config("CHUNK_COUNT_CACHE_SIZE", default="10000")),
+            ttl_seconds=float(config("CHUNK_COUNT_CACHE_TTL_SECONDS", default="300"))
+        )
     
-    def add_documents(self, db: Session, documents: List[Dict[str, Any]], user_id: str) -> List[str]:
-        """Add documents to the vector store using pgvector"""
+    def add_documents(
+        self,
+        db: Session,
+        documents: Iterable[Dict[str, Any]],
+        user_id: str,
+        stats: Optional[Dict[str, Any]] = None,
+        commit: bool = True
+    ) -> List[str]:
+        """
+        Add documents to the vector store using pgvector.
+        
+        documents may be a stream; it is consumed in windows of
+        EMBEDDING_BATCH_SIZE chunks, so only one window is held in memory at a
+        time. Each window is looked up in the embedding cache and only the
+        misses are embedded, in one model call. When stats is given, embedding
+        throughput and cache effectiveness are recorded into it. With
+        commit=False the caller owns the transaction.
+        """
         try:
             document_ids = []
+            embed_stats = {"embedded_chunks": 0, "embedding_seconds": 0.0, "cache_hits": 0}
+            summaries: Dict[str, Dict[str, Any]] = {}
             
-            for doc in documents:
-                # Generate embedding
-                embedding = embedding_service.generate_single_embedding(doc["content"])
-                
-                # Insert into database
-                result = db.execute(
-                    text("""
-                        INSERT INTO documents (
-                            id, user_id, content, embedding, metadata, created_at
-                        ) VALUES (
-                            :id, :user_id, :content, :embedding, :metadata, :created_at
-                        ) RETURNING id
-                    """),
-                    {
-                        "id": str(uuid4()),
-                        "user_id": user_id,
-                        "content": doc["content"],
-                        "embedding": embedding,
-                        "metadata": json.dumps({
-                            "source": doc.get("source", "unknown"),
-                            "chunk_index": doc.get("chunk_index", 0),
-                            "title": doc.get("title", ""),
-                            "document_id": doc.get("document_id", ""),
-                            "token_count": doc.get("token_count", 0)
-                        }),
-                        "created_at": doc.get("created_at", "")
-                    }
-                )
-                
-                document_id = result.fetchone()[0]
-                document_ids.append(document_id)
+            documents = document_catalog_service.tally(documents, summaries)
+            for batch, embeddings in self._embedded_batches(db, documents, embed_stats):
+                rows = [self._build_row(doc, embedding, user_id) for doc, embedding in zip(batch, embeddings)]
+                self._insert_rows(db, rows)
+                document_ids.extend(row["id"] for row in rows)
             
-            db.commit()
+            document_catalog_service.add_chunks(db, user_id, summaries)
+            if commit:
+                db.commit()
+            self.chunk_counts.discard(user_id)
+            
+            self._record_embedding_stats(stats, embed_stats, len(document_ids))
             return document_ids
             
         except Exception as e:
             db.rollback()
             raise Exception(f"Error adding documents to pgvector: {str(e)}")
     
+    def _build_row(self, doc: Dict[str, Any], embedding: np.ndarray, user_id: str) -> Dict[str, Any]:
+        """
+        Build a documents row for a chunk; ids are generated client-side. The
+        CHUNK_COLUMNS fields go to their own columns and the rest of the
+        chunk's metadata to the metadata JSONB.
+        """
+        return {
+            "id": str(uuid4()),
+            "user_id": user_id,
+            **self._chunk_columns(doc),
+            "content": doc["content"],
+            "embedding": embedding,
+            "created_at": doc.get("created_at") or datetime.now().isoformat()
+        }
+    
+    def _chunk_columns(self, doc: Dict[str, Any]) -> Dict[str, Any]:
+        """The CHUNK_COLUMNS values of a chunk and the rest of its metadata as JSON"""
+        metadata = self._chunk_metadata(doc)
+        return {
+            "document_id": metadata.pop("document_id") or None,
+            "chunk_index": metadata.pop("chunk_index"),
+            "title": metadata.pop("title"),
+            "source": metadata.pop("source"),
+            "token_count": metadata.pop("token_count"),
+            "metadata": json.dumps(metadata)
+        }
+    
+    def resolve_insert_strategy(self, db: Session, strategy: Optional[str] = None) -> str:
+        """Pick the bulk insert strategy, falling back to what the dialect supports"""
+        strategy = strategy or self.insert_strategy
+        dialect = db.get_bind().dialect
+        
+        if strategy == "copy" and not (dialect.name == "postgresql" and dialect.driver == "psycopg2"):
+            strategy = "values"
+        if strategy == "values" and not dialect.supports_multivalues_insert:
+            strategy = "row"
+        return strategy
+    
+    def _insert_rows(self, db: Session, rows: List[Dict[str, Any]], strategy: Optional[str] = None) -> None:
+        """Write a batch of rows with one statement where the dialect allows it"""
+        if not rows:
+            return
+        
+        strategy = self.resolve_insert_strategy(db, strategy)
+        if strategy == "copy":
+            self._copy_rows(db, rows)
+        elif strategy == "values":
+            for start in range(0, len(rows), MAX_ROWS_PER_STATEMENT):
+                self._insert_rows_multi_values(db, rows[start:start + MAX_ROWS_PER_STATEMENT])
+        else:
+            for row in rows:
+                db.execute(
+                    text(f"""
+                        INSERT INTO documents ({", ".join(DOCUMENT_COLUMNS)})
+                        VALUES ({", ".join(_placeholder(column, column) for column in DOCUMENT_COLUMNS)})
+                    """),
+                    {column: _bind_value(column, row) for column in DOCUMENT_COLUMNS}
+                )
+    
+    def _insert_rows_multi_values(self, db: Session, rows: List[Dict[str, Any]]) -> None:
+        """Insert rows with a single multi-row VALUES statement"""
+        placeholders = []
+        params = {}
+        for i, row in enumerate(rows):
+            placeholders.append("(" + ", ".join(_placeholder(column, f"{column}_{i}") for column in DOCUMENT_COLUMNS) + ")")
+            params.update({f"{column}_{i}": _bind_value(column, row) for column in DOCUMENT_COLUMNS})
+        
+        db.execute(
+            text(f"""
+                INSERT INTO documents ({", ".join(DOCUMENT_COLUMNS)})
+                VALUES {", ".join(placeholders)}
+            """),
+            params
+        )
+    
+    def _copy_rows(self, db: Session, rows: List[Dict[str, Any]]) -> None:
+        """Stream rows through COPY in binary format within the session's transaction"""
+        buffer = io.BytesIO()
+        buffer.write(PGCOPY_HEADER)
+        for row in rows:
+            buffer.write(struct.pack("!h", len(DOCUMENT_COLUMNS)))
+            _write_copy_field(buffer, UUID(row["id"]).bytes)
+            _write_copy_field(buffer, UUID(str(row["user_id"])).bytes)
+            _write_copy_field(buffer, _encode_optional_uuid(row["document_id"]))
+            _write_copy_field(buffer, struct.pack("!i", row["chunk_index"]))
+            _write_copy_field(buffer, _encode_optional_text(row["title"]))
+            _write_copy_field(buffer, _encode_optional_text(row["source"]))
+            _write_copy_field(buffer, struct.pack("!i", row["token_count"]))
+            _write_copy_field(buffer, row["content"].encode("utf-8"))
+            _write_copy_field(buffer, _encode_vector(row["embedding"]))
+            _write_copy_field(buffer, b"\x01" + row["metadata"].encode("utf-8"))  # jsonb version 1
+            _write_copy_field(buffer, _encode_timestamptz(row["created_at"]))
+        buffer.write(struct.pack("!h", -1))
+        buffer.seek(0)
+        
+        cursor = db.connection().connection.cursor()
+        try:
+            cursor.copy_expert(
+                f"COPY documents ({', '.join(DOCUMENT_COLUMNS)}) FROM STDIN WITH (FORMAT binary)",
+                buffer
+            )
+        finally:
+            cursor.close()
+    
     def search_documents(
         self, 
         db: Session,
         query: str, 
         user_id: str, 
         n_results: int = 5,
-        similarity_threshold: float = 0.5
+        similarity_threshold: float = 0.5,
+        query_embedding: Optional[np.ndarray] = None,
+        ef_search: Optional[int] = None,
+        mode: Optional[str] = None,
+        filters: Optional[Dict[str, Any]] = None
     ) -> List[Dict[str, Any]]:
-        """Search for relevant documents using pgvector"""
+        """
+        Search for relevant documents using pgvector; query_embedding skips embedding the query.
+        
+        mode is vector, hybrid, lexical or auto (RETRIEVAL_MODE by default).
+        Lexical matches content_tsv against the query with the GIN index and
+        never embeds it; auto runs keyword queries lexically, falling back to
+        vector search when nothing matches, and everything else as hybrid.
+        Hybrid fetches lexical and vector candidates in one statement and
+        merges them with reciprocal rank fusion.
+        
+        Users with fewer than EXACT_SEARCH_MAX_CHUNKS chunks are scanned
+        exactly through the user_id index, computing each distance once. Larger
+        users go through the HNSW index with hnsw.ef_search (HNSW_EF_SEARCH,
+        or ef_search for this request) and iterative scan, so the user filter
+        does not starve the result set. Each result's metadata records the
+        search_mode used.
+        
+        filters narrows the search to document_ids, sources and chunks created
+        at or after created_after. They are applied inside every candidate
+        query, and a filtered set smaller than EXACT_SEARCH_MAX_CHUNKS is
+        scanned exactly.
+        """
         try:
-            # Generate query embedding
-            query_embedding = embedding_service.generate_single_embedding(query)
+            requested_mode = (mode or self.retrieval_mode).lower()
+            retrieval_mode = self.resolve_retrieval_mode(query, mode)
+            filters = self.normalize_filters(filters)
+            filter_sql, filter_params = self._filter_sql(filters)
+            
+            if retrieval_mode == "lexical":
+                search_mode = "lexical"
+                rows = self._lexical_search(db, query, user_id, n_results, filter_sql, filter_params)
+                if rows or requested_mode != "auto":
+                    return self._format_results(rows, search_mode)
+                retrieval_mode = "vector"
+            
+            # Generate query embedding; repeated queries come from the cache
+            if query_embedding is None:
+                query_embedding = embedding_service.embed_query(query)
+            
+            params = {
+                "query_embedding": vector_literal(query_embedding),
+                "user_id": user_id,
+                "max_distance": 1 - similarity_threshold,
+                "limit": n_results,
+                **filter_params
+            }
+            
+            if filters:
+                exact = self._filtered_chunk_count(db, user_id, filter_sql, filter_params) < self.exact_search_threshold
+            else:
+                exact = self.user_chunk_count(db, user_id) < self.exact_search_threshold
+            if not exact:
+                candidates = max(n_results, self.hybrid_candidates) if retrieval_mode == "hybrid" else n_results
+                self._set_hnsw_options(db, max(ef_search or self.hnsw_ef_search, candidates))
+            
+            if retrieval_mode == "hybrid":
+                rows = self._hybrid_search(db, query, params, n_results, filter_sql, exact)
+                return self._format_results(rows, "hybrid", semantic_mode="exact" if exact else "hnsw")
+            elif exact:
+                search_mode = "exact"
+                rows = db.execute(
+                    text(f"""
+                        WITH scored AS MATERIALIZED (
+                            SELECT {RESULT_COLUMNS}, embedding <=> CAST(:query_embedding AS vector) AS distance
+                            FROM documents
+                            WHERE user_id = :user_id{filter_sql}
+                        )
+                        SELECT {RESULT_COLUMNS}, 1 - distance AS similarity
+                        FROM scored
+                        WHERE distance < :max_distance
+                        ORDER BY distance
+                        LIMIT :limit
+                    """),
+                    params
+                ).fetchall()
+            else:
+                search_mode = "hnsw"
+                rows = db.execute(
+                    text(f"""
+                        SELECT {RESULT_COLUMNS}, 1 - distance AS similarity
+                        FROM (
+                            SELECT {RESULT_COLUMNS}, embedding <=> CAST(:query_embedding AS vector) AS distance
+                            FROM documents
+                            WHERE user_id = :user_id{filter_sql}
+                            ORDER BY distance
+                            LIMIT :limit
+                        ) candidates
+                        WHERE distance < :max_distance
+                        ORDER BY distance
+                    """),
+                    params
+                ).fetchall()
+            
+            return self._format_results(rows, search_mode)
             
-            # Search using cosine similarity
+        except Exception as e:
+            raise Exception(f"Error searching documents: {str(e)}")
+    
+    def _lexical_search(
+        self,
+        db: Session,
+        query: str,
+        user_id: str,
+        n_results: int,
+        filter_sql: str = "",
+        filter_params: Optional[Dict[str, Any]] = None
+    ) -> List[Any]:
+        """
+        Full-text matches ranked by ts_rank_cd. The rank is scaled to 0-1 and
+        returned as the similarity.
+        """
+        return db.execute(
+            text(f"""
+                SELECT {RESULT_COLUMNS}, ts_rank_cd(content_tsv, query, 32) AS similarity
+                FROM documents, websearch_to_tsquery(CAST(:text_search_config AS regconfig), :query) query
+                WHERE user_id = :user_id{filter_sql} AND content_tsv @@ query
+                ORDER BY similarity DESC
+                LIMIT :limit
+            """),
+            {
+                "text_search_config": self.text_search_config,
+                "query": query,
+                "user_id": user_id,
+                "limit": n_results,
+                **(filter_params or {})
+            }
+        ).fetchall()
+    
+    def _hybrid_search(
+        self,
+        db: Session,
+        query: str,
+        params: Dict[str, Any],
+        n_results: int,
+        filter_sql: str = "",
+        exact: bool = False
+    ) -> List[Any]:
+        """
+        Reciprocal rank fusion of the top HYBRID_CANDIDATES lexical and vector
+        candidates: each chunk scores sum(1 / (RRF_K + rank)) over the lists it
+        appears in. Vector candidates must pass the similarity threshold and,
+        as in vector search, come from an exact scan of the user's rows when
+        exact is set and from the HNSW index otherwise. The returned similarity
+        is the chunk's cosine similarity and score its fused score.
+        """
+        if exact:
+            semantic_sql = f"""
+                scored AS MATERIALIZED (
+                    SELECT id, embedding <=> CAST(:query_embedding AS vector) AS distance
+                    FROM documents
+                    WHERE user_id = :user_id{filter_sql}
+                ),
+                semantic AS (
+                    SELECT id, ROW_NUMBER() OVER (ORDER BY distance) AS rank
+                    FROM (
+                        SELECT id, distance
+                        FROM scored
+                        WHERE distance < :max_distance
+                        ORDER BY distance
+                        LIMIT :candidates
+                    ) nearest
+                )"""
+        else:
+            semantic_sql = f"""
+                semantic AS (
+                    SELECT id, ROW_NUMBER() OVER (ORDER BY distance) AS rank
+                    FROM (
+                        SELECT id, embedding <=> CAST(:query_embedding AS vector) AS distance
+                        FROM documents
+                        WHERE user_id = :user_id{filter_sql}
+                        ORDER BY distance
+                        LIMIT :candidates
+                    ) nearest
+                    WHERE distance < :max_distance
+                )"""
+        
+        return db.execute(
+            text(f"""
+                WITH lexical AS (
+                    SELECT id, ROW_NUMBER() OVER (ORDER BY ts_rank_cd(content_tsv, query) DESC) AS rank
+                    FROM documents, websearch_to_tsquery(CAST(:text_search_config AS regconfig), :query) query
+                    WHERE user_id = :user_id{filter_sql} AND content_tsv @@ query
+                    ORDER BY rank
+                    LIMIT :candidates
+                ),{semantic_sql},
+                fused AS (
+                    SELECT id, SUM(1.0 / (:rrf_k + rank)) AS score
+                    FROM (
+                        SELECT id, rank FROM lexical
+                        UNION ALL
+                        SELECT id, rank FROM semantic
+                    ) ranked
+                    GROUP BY id
+                    ORDER BY score DESC
+                    LIMIT :limit
+                )
+                SELECT d.id, d.content, d.metadata, d.document_id, d.chunk_index, d.title, d.source, d.token_count,
+                       1 - (d.embedding <=> CAST(:query_embedding AS vector)) AS similarity,
+                       fused.score
+                FROM fused
+                JOIN documents d ON d.id = fused.id
+                ORDER BY fused.score DESC
+            """),
+            {
+                **params,
+                "text_search_config": self.text_search_config,
+                "query": query,
+                "candidates": max(self.hybrid_candidates, n_results),
+                "rrf_k": self.rrf_k
+            }
+        ).fetchall()
+    
+    def _filter_sql(self, filters: Dict[str, Any]) -> Tuple[str, Dict[str, Any]]:
+        """SQL conditions, to follow user_id = :user_id, and their parameters for normalized filters"""
+        conditions = []
+        params = {}
+        if "document_ids" in filters:
+            conditions.append(" AND document_id = ANY(CAST(:filter_document_ids AS uuid[]))")
+            params["filter_document_ids"] = filters["document_ids"]
+        if "sources" in filters:
+            conditions.append(" AND source = ANY(:filter_sources)")
+            params["filter_sources"] = filters["sources"]
+        if "created_after" in filters:
+            conditions.append(" AND created_at >= :filter_created_after")
+            params["filter_created_after"] = filters["created_after"]
+        return "".join(conditions), params
+    
+    def _filtered_chunk_count(self, db: Session, user_id: str, filter_sql: str, filter_params: Dict[str, Any]) -> int:
+        """Chunks matching the filters, counted only up to EXACT_SEARCH_MAX_CHUNKS"""
+        return db.execute(
+            text(f"""
+                SELECT COUNT(*) FROM (
+                    SELECT 1 FROM documents
+                    WHERE user_id = :user_id{filter_sql}
+                    LIMIT :max_count
+                ) matching
+            """),
+            {"user_id": user_id, "max_count": self.exact_search_threshold, **filter_params}
+        ).scalar()
+    
+    def _format_results(
+        self,
+        rows: List[Any],
+        search_mode: str,
+        semantic_mode: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Search results, with the chunk columns merged back into each result's
+        metadata. Hybrid results also record whether their vector candidates
+        came from an exact or an HNSW scan as semantic_search_mode.
+        """
+        formatted_results = []
+        for row in rows:
+            metadata = json.loads(row.metadata) if isinstance(row.metadata, str) else dict(row.metadata)
+            metadata.update(
+                document_id=str(row.document_id) if row.document_id else "",
+                chunk_index=row.chunk_index,
+                title=row.title,
+                source=row.source,
+                token_count=row.token_count,
+                search_mode=search_mode
+            )
+            result = {
+                "id": row.id,
+                "content": row.content,
+                "metadata": metadata,
+                "similarity": float(row.similarity)
+            }
+            if semantic_mode:
+                metadata["semantic_search_mode"] = semantic_mode
+            if search_mode == "hybrid":
+                result["score"] = float(row.score)
+            formatted_results.append(result)
+        return formatted_results
+    
+    def user_chunk_count(self, db: Session, user_id: str) -> int:
+        """
+        Number of chunks the user has stored, summed from the document catalog
+        and cached for CHUNK_COUNT_CACHE_TTL_SECONDS
+        """
+        count = self.chunk_counts.get(user_id)
+        if count is None:
+            count = document_catalog_service.chunk_count(db, user_id)
+            self.chunk_counts.put(user_id, count)
+        return count
+    
+    def _set_hnsw_options(self, db: Session, ef_search: int) -> None:
+        """
+        Set HNSW search options for the rest of the current transaction.
+        hnsw.iterative_scan only exists from pgvector 0.8, so it is left
+        untouched when HNSW_ITERATIVE_SCAN is off.
+        """
+        if self.hnsw_iterative_scan == "off":
+            db.execute(
+                text("SELECT set_config('hnsw.ef_search', :ef_search, true)"),
+                {"ef_search": str(ef_search)}
+            )
+            return
+        db.execute(
+            text("""
+                SELECT
+                    set_config('hnsw.ef_search', :ef_search, true),
+                    set_config('hnsw.iterative_scan', :iterative_scan, true)
+            """),
+            {"ef_search": str(ef_search), "iterative_scan": self.hnsw_iterative_scan}
+        )
+    
+    def reingest_document(
+        self,
+        db: Session,
+        user_id: str,
+        document_id: str,
+        documents: List[Dict[str, Any]],
+        stats: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """
+        Replace a document's chunks with a new version, touching only what changed.
+        
+        New chunks are matched to stored rows by content hash, preferring rows
+        at the same chunk_index. Matched rows keep their embedding and are
+        updated in place only where the new version differs: title, source and
+        metadata (e.g. file_hash or pages), and chunk_index for rows that moved.
+        chunk_index is indexed, so a moved row gets new index entries, but is
+        not re-embedded. Only new chunks are embedded and inserted and only
+        removed chunks are deleted, all in one transaction.
+        """
+        try:
+            try:
+                UUID(document_id)
+            except ValueError:
+                raise LookupError(f"Document {document_id} not found")
+            
+            # Served by the (user_id, document_id, chunk_index) index
             result = db.execute(
                 text("""
-                    SELECT 
-                        id, content, metadata,
-                        1 - (embedding <=> :query_embedding) as similarity
-                    FROM documents 
-                    WHERE user_id = :user_id
-                    AND 1 - (embedding <=> :query_embedding) > :threshold
-                    ORDER BY embedding <=> :query_embedding
-                    LIMIT :limit
+                    SELECT
+                        id,
+                        chunk_index,
+                        metadata->>'content_hash' AS content_hash,
+                        CASE WHEN metadata ? 'content_hash' THEN NULL ELSE content END AS content
+                    FROM documents
+                    WHERE user_id = :user_id AND document_id = CAST(:document_id AS uuid)
                 """),
-                {
-                    "query_embedding": query_embedding,
-                    "user_id": user_id,
-                    "threshold": similarity_threshold,
-                    "limit": n_results
-                }
+                {"user_id": user_id, "document_id": document_id}
             )
+            existing_rows = result.fetchall()
+            if not existing_rows:
+                raise LookupError(f"Document {document_id} not found")
             
-            # Format results
-            formatted_results = []
-            for row in result.fetchall():
-                formatted_results.append({
-                    "id": row.id,
-                    "content": row.content,
-                    "metadata": json.loads(row.metadata),
-                    "similarity": float(row.similarity)
-                })
+            unchanged, moved, new_documents, removed_ids = self._match_chunks(
+                (
+                    (str(row.id), row.chunk_index, row.content_hash or content_hash(row.content))
+                    for row in existing_rows
+                ),
+                documents
+            )
+            
+            kept = unchanged + moved
+            if kept:
+                db.execute(
+                    text("""
+                        UPDATE documents
+                        SET
+                            chunk_index = :chunk_index,
+                            title = :title,
+                            source = :source,
+                            metadata = CAST(:metadata AS jsonb)
+                        WHERE id = CAST(:id AS uuid)
+                          AND (
+                              chunk_index <> :chunk_index
+                              OR title IS DISTINCT FROM :title
+                              OR source IS DISTINCT FROM :source
+                              OR metadata <> CAST(:metadata AS jsonb)
+                          )
+                    """),
+                    [{"id": row_id, **self._chunk_columns(doc)} for row_id, doc in kept]
+                )
+            if removed_ids:
+                db.execute(
+                    text("DELETE FROM documents WHERE id = ANY(CAST(:ids AS uuid[]))"),
+                    {"ids": removed_ids}
+                )
+            inserted_ids = self.add_documents(db, new_documents, user_id, stats=stats, commit=False)
+            document_catalog_service.replace_document(
+                db, user_id, document_id, self._summarize_document(document_id, documents)
+            )
+            
+            db.commit()
+            self.chunk_counts.discard(user_id)
             
-            return formatted_results
+            return {
+                "document_id": document_id,
+                "total_chunks": len(documents),
+                "unchanged_chunks": len(unchanged),
+                "moved_chunks": len(moved),
+                "inserted_chunks": len(inserted_ids),
+                "deleted_chunks": len(removed_ids),
+                "chunk_ids": inserted_ids
+            }
             
+        except LookupError:
+            db.rollback()
+            raise
         except Exception as e:
-            raise Exception(f"Error searching documents: {str(e)}")
+            db.rollback()
+            raise Exception(f"Error re-ingesting document: {str(e)}")
     
     def delete_user_documents(self, db: Session, user_id: str) -> bool:
         """Delete all documents for a specific user"""
@@ -113,53 +664,103 @@ class PGVectorStoreService:
                 text("DELETE FROM documents WHERE user_id = :user_id"),
                 {"user_id": user_id}
             )
+            document_catalog_service.delete_user_documents(db, user_id)
             db.commit()
+            self.chunk_counts.discard(user_id)
             return True
             
         except Exception as e:
             db.rollback()
             raise Exception(f"Error deleting user documents: {str(e)}")
     
-    def get_document_stats(self, db: Session, user_id: str) -> Dict[str, Any]:
-        """Get statistics about user's documents"""
-        try:
-            # Get total count
-            count_result = db.execute(
-                text("SELECT COUNT(*) FROM documents WHERE user_id = :user_id"),
-                {"user_id": user_id}
-            )
-            total_chunks = count_result.fetchone()[0]
-            
-            # Get unique sources
-            sources_result = db.execute(
-                text("""
-                    SELECT DISTINCT metadata->>'source' as source
-                    FROM documents 
-                    WHERE user_id = :user_id
-                """),
-                {"user_id": user_id}
-            )
-            sources = [row.source for row in sources_result.fetchall() if row.source]
-            
-            return {
-                "total_documents": len(set([row.source for row in sources_result.fetchall() if row.source])),
-                "total_chunks": total_chunks,
-                "sources": sources
-            }
-            
-        except Exception as e:
-            raise Exception(f"Error getting document stats: {str(e)}")
+    def has_chunks(self, db: Session) -> bool:
+        """Whether any user has chunks stored"""
+        return db.execute(text("SELECT 1 FROM documents LIMIT 1")).first() is not None
+    
+    def document_summaries(self, db: Session) -> Iterator[Dict[str, Any]]:
+        """Catalog summaries of every stored document, aggregated from its chunks"""
+        result = db.execute(text("""
+            SELECT
+                user_id,
+                document_id,
+                MIN(title) AS title,
+                MIN(source) AS source,
+                MIN(metadata->>'file_hash') AS file_hash,
+                COUNT(*) AS chunk_count,
+                COALESCE(SUM(token_count), 0) AS token_count,
+                COALESCE(MIN(token_count), 0) AS min_chunk_tokens,
+                COALESCE(MAX(token_count), 0) AS max_chunk_tokens,
+                MIN(created_at) AS created_at
+            FROM documents
+            WHERE document_id IS NOT NULL
+            GROUP BY user_id, document_id
+        """))
+        for row in result:
+            summary = dict(row._mapping)
+            summary["user_id"] = str(summary["user_id"])
+            summary["document_id"] = str(summary["document_id"])
+            summary["updated_at"] = summary["created_at"]
+            yield summary
+    
+    def hnsw_index_sql(
+        self,
+        m: Optional[int] = None,
+        ef_construction: Optional[int] = None,
+        index_name: str = "documents_embedding_idx"
+    ) -> str:
+        """CREATE INDEX statement for the HNSW index, using HNSW_M and HNSW_EF_CONSTRUCTION by default"""
+        return f"""
+            CREATE INDEX IF NOT EXISTS {index_name} 
+            ON documents 
+            USING hnsw (embedding vector_cosine_ops)
+            WITH (m = {int(m or self.hnsw_m)}, ef_construction = {int(ef_construction or self.hnsw_ef_construction)})
+        """
+    
+    def chunk_column_sql(self) -> List[str]:
+        """Statements adding the CHUNK_COLUMNS and their index to an existing documents table"""
+        return [
+            """
+            ALTER TABLE documents 
+                ADD COLUMN IF NOT EXISTS document_id UUID,
+                ADD COLUMN IF NOT EXISTS chunk_index INTEGER NOT NULL DEFAULT 0,
+                ADD COLUMN IF NOT EXISTS title TEXT,
+                ADD COLUMN IF NOT EXISTS source TEXT,
+                ADD COLUMN IF NOT EXISTS token_count INTEGER NOT NULL DEFAULT 0
+            """,
+            """
+            CREATE INDEX IF NOT EXISTS documents_document_idx 
+            ON documents (user_id, document_id, chunk_index)
+            """
+        ]
+    
+    def full_text_search_sql(self) -> List[str]:
+        """Statements adding the generated content_tsv column and its GIN index to an existing table"""
+        return [
+            f"""
+            ALTER TABLE documents 
+            ADD COLUMN IF NOT EXISTS content_tsv tsvector 
+            GENERATED ALWAYS AS (to_tsvector('{self.text_search_config}', content)) STORED
+            """,
+            """
+            CREATE INDEX IF NOT EXISTS documents_content_tsv_idx 
+            ON documents 
+            USING gin (content_tsv)
+            """
+        ]
     
     def create_indexes(self, db: Session) -> bool:
         """Create necessary indexes for optimal performance"""
         try:
             # Create HNSW index for fast similarity search
-            db.execute(text("""
-                CREATE INDEX IF NOT EXISTS documents_embedding_idx 
-                ON documents 
-                USING hnsw (embedding vector_cosine_ops)
-                WITH (m = 16, ef_construction = 64)
-            """))
+            db.execute(text(self.hnsw_index_sql()))
+            
+            # Create chunk columns and the per-document index
+            for statement in self.chunk_column_sql():
+                db.execute(text(statement))
+            
+            # Create full-text column and GIN index for lexical and hybrid search
+            for statement in self.full_text_search_sql():
+                db.execute(text(statement))
             
             # Create index on user_id for filtering
             db.execute(text("""
@@ -167,6 +768,9 @@ class PGVectorStoreService:
                 ON documents (user_id)
             """))
             
+            # Duplicate uploads are found through the document catalog
+            db.execute(text("DROP INDEX IF EXISTS documents_file_hash_idx"))
+            
             db.commit()
             return True
             
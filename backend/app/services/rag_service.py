@@ -1,10 +1,15 @@
 import os
-from typing import List, Dict, Any, Optional
+from itertools import islice
+from typing import List, Dict, Any, Iterable, Iterator, Optional
+from uuid import uuid4
 from sqlalchemy.orm import Session
-from app.services.document_processor import document_processor
+from app.services.document_processor import document_processor, process_text_chunks
+from app.services.embedding_service import embedding_service
 from app.services.vector_store_factory import vector_store_factory
+from app.services.document_catalog_service import document_catalog_service
 from app.services.llm_service import llm_service
-from app.services.message_service import create_message
+from app.services.message_service import create_message, get_chat_history
+from app.services.executor_service import executor_service
 
 class RAGService:
     """Main RAG service that orchestrates the entire pipeline"""
@@ -19,61 +24,248 @@ class RAGService:
         user_id: str, 
         file_path: Optional[str] = None, 
         text_content: Optional[str] = None,
+        title: str = "Document",
+        file_hash: Optional[str] = None,
+        force: bool = False
+    ) -> Dict[str, Any]:
+        """
+        Ingest a document into the RAG system.
+        
+        Content the user has already ingested, identified by the sha256 of the
+        file bytes or text, is not processed again: the existing document is
+        returned unless force is set. The pipeline runs in the shared thread
+        pool so that the event loop keeps serving other requests.
+        """
+        return await executor_service.run_in_thread(
+            self._ingest_document_sync, db, user_id, file_path, text_content, title, file_hash, force
+        )
+    
+    def _ingest_document_sync(
+        self,
+        db: Session,
+        user_id: str,
+        file_path: Optional[str],
+        text_content: Optional[str],
+        title: str,
+        file_hash: Optional[str],
+        force: bool
+    ) -> Dict[str, Any]:
+        try:
+            is_pdf = bool(file_path and file_path.lower().endswith('.pdf'))
+            if is_pdf:
+                file_hash = file_hash or document_processor.fingerprint_file(file_path)
+            elif text_content:
+                file_hash = file_hash or document_processor.fingerprint_text(text_content)
+            else:
+                raise ValueError("Either file_path or text_content must be provided")
+            
+            vector_store = vector_store_factory.get_vector_store()
+            if not force:
+                existing = vector_store.find_document_by_hash(db, user_id, file_hash)
+                if existing:
+                    return {
+                        "success": True,
+                        "document_id": existing["document_id"],
+                        "total_chunks": existing["stats"]["total_chunks"],
+                        "chunk_ids": [],
+                        "stats": existing["stats"],
+                        "title": existing["title"],
+                        "deduplicated": True
+                    }
+            
+            document_id = str(uuid4())
+            
+            # Process document based on type; PDFs are streamed page by page
+            if is_pdf:
+                chunks = document_processor.iter_pdf_chunks(
+                    file_path, user_id, title, document_id, executor=self._pdf_executor()
+                )
+            else:
+                chunks = self._chunk_text(text_content, user_id, title, document_id)
+            
+            # Add chunks to vector store as they are produced
+            summary: Dict[str, Any] = {"token_counts": [], "truncated_chunks": 0}
+            embedding_stats: Dict[str, Any] = {}
+            chunk_ids = vector_store.add_documents(
+                db, self._track_chunks(chunks, summary, file_hash, vector_store.embedding_batch_size),
+                user_id, stats=embedding_stats
+            )
+            
+            # Get processing statistics
+            token_counts = summary["token_counts"]
+            stats = document_processor.get_token_stats(token_counts)
+            stats["truncated_chunks"] = summary["truncated_chunks"]
+            stats.update(embedding_stats)
+            
+            return {
+                "success": True,
+                "document_id": document_id if token_counts else None,
+                "total_chunks": len(token_counts),
+                "chunk_ids": chunk_ids,
+                "stats": stats,
+                "title": title,
+                "deduplicated": False
+            }
+            
+        except Exception as e:
+            return {
+                "success": False,
+                "error": str(e)
+            }
+    
+    async def reingest_document(
+        self,
+        db: Session,
+        user_id: str,
+        document_id: str,
+        file_path: Optional[str] = None,
+        text_content: Optional[str] = None,
         title: str = "Document"
     ) -> Dict[str, Any]:
-        """Ingest a document into the RAG system"""
+        """Re-ingest a new version of a document, embedding only the chunks that changed"""
+        return await executor_service.run_in_thread(
+            self._reingest_document_sync, db, user_id, document_id, file_path, text_content, title
+        )
+    
+    def _reingest_document_sync(
+        self,
+        db: Session,
+        user_id: str,
+        document_id: str,
+        file_path: Optional[str],
+        text_content: Optional[str],
+        title: str
+    ) -> Dict[str, Any]:
         try:
-            # Process document based on type
             if file_path and file_path.lower().endswith('.pdf'):
-                chunks = document_processor.process_pdf(file_path, user_id)
+                file_hash = document_processor.fingerprint_file(file_path)
+                chunks = list(document_processor.iter_pdf_chunks(
+                    file_path, user_id, title, document_id, executor=self._pdf_executor()
+                ))
             elif text_content:
-                chunks = document_processor.process_text(text_content, user_id, title)
+                file_hash = document_processor.fingerprint_text(text_content)
+                chunks = self._chunk_text(text_content, user_id, title, document_id)
             else:
                 raise ValueError("Either file_path or text_content must be provided")
             
-            # Add chunks to vector store
+            for chunk in chunks:
+                chunk["document_id"] = document_id
+                chunk["file_hash"] = file_hash
+            
+            embedding_stats: Dict[str, Any] = {}
             vector_store = vector_store_factory.get_vector_store()
-            chunk_ids = vector_store.add_documents(db, chunks, user_id)
+            result = vector_store.reingest_document(db, user_id, document_id, chunks, stats=embedding_stats)
             
-            # Get processing statistics
             stats = document_processor.get_chunk_stats(chunks)
+            stats["truncated_chunks"] = document_processor.count_truncated_chunks(
+                [chunk["content"] for chunk in chunks]
+            )
+            stats.update(embedding_stats)
             
             return {
                 "success": True,
-                "document_id": chunks[0]["document_id"] if chunks else None,
-                "total_chunks": len(chunks),
-                "chunk_ids": chunk_ids,
+                **result,
                 "stats": stats,
                 "title": title
             }
             
+        except LookupError as e:
+            return {
+                "success": False,
+                "not_found": True,
+                "error": str(e)
+            }
         except Exception as e:
             return {
                 "success": False,
                 "error": str(e)
             }
     
+    def _pdf_executor(self):
+        """The shared process pool when PDF_EXTRACT_WORKERS allows parallel extraction, else None (serial)"""
+        return executor_service.process_pool if document_processor.extract_workers > 1 else None
+    
+    def _chunk_text(self, text: str, user_id: str, title: str, document_id: str) -> List[Dict[str, Any]]:
+        """
+        Chunk plain text in the process pool. Embedding-aligned chunking needs
+        the model's tokenizer, which only this process holds, so it runs here.
+        """
+        if document_processor.embedding_aligned:
+            return document_processor.process_text(text, user_id, title, document_id)
+        return executor_service.process_pool.submit(
+            process_text_chunks, text, user_id, title, document_id
+        ).result()
+    
+    def _track_chunks(
+        self,
+        chunks: Iterable[Dict[str, Any]],
+        summary: Dict[str, Any],
+        file_hash: str,
+        window_size: int
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Pass chunks through, tagging them with the file hash and recording
+        their token counts and whether the embedding model would truncate them.
+        Chunks sized by the embedding tokenizer already carry the count it
+        would see; otherwise each window is tokenized in one call.
+        """
+        chunks = iter(chunks)
+        limit = document_processor.embedding_token_limit() if document_processor.embedding_aligned else None
+        while True:
+            window = list(islice(chunks, window_size))
+            if not window:
+                return
+            for chunk in window:
+                chunk["file_hash"] = file_hash
+                summary["token_counts"].append(chunk.get("token_count", 0))
+            if limit is not None:
+                summary["truncated_chunks"] += sum(1 for chunk in window if chunk.get("token_count", 0) > limit)
+            else:
+                summary["truncated_chunks"] += document_processor.count_truncated_chunks(
+                    [chunk["content"] for chunk in window]
+                )
+            yield from window
+    
     async def generate_rag_response(
         self, 
         db: Session, 
         chat_id: str, 
         user_id: str, 
         user_message: str,
-        llm_provider: Optional[str] = None
+        llm_provider: Optional[str] = None,
+        filters: Optional[Dict[str, Any]] = None
     ) -> Dict[str, Any]:
-        """Generate a RAG-enhanced response"""
+        """
+        Generate a RAG-enhanced response. filters (document_ids, sources,
+        created_after) restrict retrieval to part of the user's documents.
+        """
         try:
-            # Retrieve relevant documents
             vector_store = vector_store_factory.get_vector_store()
-            retrieved_docs = vector_store.search_documents(
-                db, query=user_message,
-                user_id=user_id,
-                n_results=self.max_retrieved_chunks,
-                similarity_threshold=0.5
-            )
+            
+            # Users without documents skip the query embedding and search entirely
+            retrieved_docs = []
+            if await executor_service.run_in_thread(document_catalog_service.has_documents, db, user_id):
+                # Embed the query unless it is a keyword lookup answered by full-text search;
+                # concurrent requests share one batched encode
+                query_embedding = None
+                if vector_store.resolve_retrieval_mode(user_message) != "lexical":
+                    query_embedding = await embedding_service.aembed_query(user_message)
+                
+                # Retrieve relevant documents
+                retrieved_docs = await executor_service.run_in_thread(
+                    vector_store.search_documents,
+                    db, query=user_message,
+                    user_id=user_id,
+                    n_results=self.max_retrieved_chunks,
+                    similarity_threshold=0.5,
+                    query_embedding=query_embedding,
+                    filters=filters
+                )
             
             # Create user message
-            user_message_id = create_message(db, chat_id, user_id, "user", user_message)
+            user_message_id = await executor_service.run_in_thread(
+                create_message, db, chat_id, user_id, "user", user_message
+            )
             
             # Prepare context from retrieved documents
             context = self._prepare_context(retrieved_docs)
@@ -82,8 +274,7 @@ class RAGService:
             system_prompt = self._create_rag_system_prompt(context)
             
             # Get chat history
-            from app.services.message_service import get_chat_history
-            chat_history = get_chat_history(db, chat_id)
+            chat_history = await executor_service.run_in_thread(get_chat_history, db, chat_id)
             
             # Generate AI response with RAG context
             ai_response = await llm_service.generate_chat_response(
@@ -96,7 +287,9 @@ class RAGService:
             )
             
             # Create AI response message
-            ai_message_id = create_message(db, chat_id, user_id, "assistant", ai_response)
+            ai_message_id = await executor_service.run_in_thread(
+                create_message, db, chat_id, user_id, "assistant", ai_response
+            )
             
             return {
                 "user_message_id": user_message_id,
@@ -0,0 +1,197 @@
+import os
+import json
+import fcntl
+import shutil
+import hashlib
+import threading
+from contextlib import contextmanager, nullcontext
+from typing import Iterable, Optional, Tuple
+import numpy as np
+
+VECTORS_FILE = "vectors.f32"
+IDS_FILE = "ids.i64"
+META_FILE = "meta.json"
+LOCK_FILE = ".lock"
+
+ID_DTYPE = np.dtype("<i8")
+VECTOR_DTYPE = np.dtype("<f4")
+
+def shard_dir_name(user_id: str) -> str:
+    """Filesystem-safe directory name for a user's shard"""
+    return hashlib.sha256(user_id.encode("utf-8")).hexdigest()
+
+class VectorShard:
+    """
+    One user's vectors on disk: a raw float32 matrix (vectors.f32) and the
+    matching int64 ids (ids.i64), row for row.
+    
+    Both files are opened with np.memmap, so only the pages a search touches
+    are resident. Appends write vectors before ids and readers size the
+    matrix from the ids file, so a reader never sees a row without its id.
+    Removal rewrites both files without the removed rows and swaps them in.
+    Writers take an exclusive flock on the shard directory, so several
+    processes can share one VECTOR_STORE_DIR; exclusive() holds it across a
+    sequence of operations. Appends skip ids the shard already has.
+    """
+    
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.RLock()
+        self._signature = None
+        self._vectors: Optional[np.ndarray] = None
+        self._ids: Optional[np.ndarray] = None
+        self._lock_depth = 0  # Nesting of _file_lock within the thread holding _lock
+    
+    def _file(self, name: str) -> str:
+        return os.path.join(self.path, name)
+    
+    @contextmanager
+    def _file_lock(self, exclusive: bool):
+        # Callers hold self._lock; a nested call reuses the flock already held
+        if self._lock_depth:
+            self._lock_depth += 1
+            try:
+                yield
+            finally:
+                self._lock_depth -= 1
+            return
+        os.makedirs(self.path, exist_ok=True)
+        with open(self._file(LOCK_FILE), "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            self._lock_depth = 1
+            try:
+                yield
+            finally:
+                self._lock_depth = 0
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+    
+    @contextmanager
+    def exclusive(self):
+        """Hold the exclusive lock, so that other writers wait until the block ends"""
+        with self._lock, self._file_lock(exclusive=True):
+            yield
+    
+    def exists(self) -> bool:
+        return os.path.exists(self._file(META_FILE))
+    
+    def dimension(self) -> Optional[int]:
+        if not self.exists():
+            return None
+        with open(self._file(META_FILE)) as f:
+            return json.load(f)["dimension"]
+    
+    def _stat_signature(self):
+        try:
+            stat = os.stat(self._file(IDS_FILE))
+        except FileNotFoundError:
+            return None
+        return stat.st_ino, stat.st_size
+    
+    def _mapped(self, take_lock: bool = True) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Current memory maps, remapped when another writer changed the files.
+        Pass take_lock=False when the caller already holds the exclusive lock.
+        """
+        with self._lock:
+            signature = self._stat_signature()
+            if signature is None:
+                self._signature, self._vectors, self._ids = None, None, None
+                return np.empty((0, 0), dtype=VECTOR_DTYPE), np.empty(0, dtype=ID_DTYPE)
+            if signature != self._signature:
+                with self._file_lock(exclusive=False) if take_lock else nullcontext():
+                    dimension = self.dimension()
+                    count = os.path.getsize(self._file(IDS_FILE)) // ID_DTYPE.itemsize
+                    if count == 0:
+                        self._vectors = np.empty((0, dimension), dtype=VECTOR_DTYPE)
+                        self._ids = np.empty(0, dtype=ID_DTYPE)
+                    else:
+                        self._vectors = np.memmap(
+                            self._file(VECTORS_FILE), dtype=VECTOR_DTYPE, mode="r", shape=(count, dimension)
+                        )
+                        self._ids = np.memmap(self._file(IDS_FILE), dtype=ID_DTYPE, mode="r", shape=(count,))
+                    self._signature = self._stat_signature()
+            return self._vectors, self._ids
+    
+    def snapshot(self) -> Tuple[np.ndarray, np.ndarray]:
+        """The memory-mapped (count, dimension) vectors and their ids, consistent with each other"""
+        return self._mapped()
+    
+    def count(self) -> int:
+        return len(self._mapped()[1])
+    
+    def vectors(self) -> np.ndarray:
+        """The memory-mapped (count, dimension) matrix"""
+        return self._mapped()[0]
+    
+    def ids(self) -> np.ndarray:
+        return self._mapped()[1]
+    
+    def append(self, ids: np.ndarray, vectors: np.ndarray) -> None:
+        """Append rows to the end of the shard, skipping ids it already has"""
+        ids = np.ascontiguousarray(ids, dtype=ID_DTYPE)
+        vectors = np.ascontiguousarray(vectors, dtype=VECTOR_DTYPE)
+        if not len(ids):
+            return
+        with self._lock, self._file_lock(exclusive=True):
+            if not self.exists():
+                self._write_meta(vectors.shape[1])
+            else:
+                # A rebuild from the database may already hold these rows
+                new = ~np.isin(ids, self._mapped(take_lock=False)[1])
+                if not new.all():
+                    ids, vectors = ids[new], vectors[new]
+                    if not len(ids):
+                        return
+            # Drop any partial append left by a crashed writer
+            count = 0
+            if os.path.exists(self._file(IDS_FILE)):
+                count = os.path.getsize(self._file(IDS_FILE)) // ID_DTYPE.itemsize
+            with open(self._file(VECTORS_FILE), "ab") as f:
+                f.truncate(count * vectors.shape[1] * VECTOR_DTYPE.itemsize)
+                f.write(vectors.tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+            with open(self._file(IDS_FILE), "ab") as f:
+                f.write(ids.tobytes())
+    
+    def remove(self, ids: Iterable[int]) -> int:
+        """Compact the shard without the given ids; returns the number of rows removed"""
+        remove = np.fromiter(ids, dtype=ID_DTYPE)
+        if not len(remove):
+            return 0
+        with self._lock, self._file_lock(exclusive=True):
+            vectors, current_ids = self._mapped(take_lock=False)
+            keep = ~np.isin(current_ids, remove)
+            removed = int(len(keep) - keep.sum())
+            if removed:
+                self._replace(current_ids[keep], vectors[keep], vectors.shape[1])
+            return removed
+    
+    def rebuild(self, ids: np.ndarray, vectors: np.ndarray, dimension: int) -> None:
+        """Replace the whole shard"""
+        with self._lock, self._file_lock(exclusive=True):
+            if not self.exists():
+                self._write_meta(dimension)
+            self._replace(np.asarray(ids, dtype=ID_DTYPE), np.asarray(vectors, dtype=VECTOR_DTYPE), dimension)
+    
+    def destroy(self) -> None:
+        """Delete the shard from disk"""
+        with self._lock:
+            shutil.rmtree(self.path, ignore_errors=True)
+            self._signature, self._vectors, self._ids = None, None, None
+    
+    def _write_meta(self, dimension: int) -> None:
+        with open(self._file(META_FILE) + ".tmp", "w") as f:
+            json.dump({"dimension": dimension}, f)
+        os.replace(self._file(META_FILE) + ".tmp", self._file(META_FILE))
+    
+    def _replace(self, ids: np.ndarray, vectors: np.ndarray, dimension: int) -> None:
+        # Readers map under a shared lock, so they never see one new file and one old one
+        vectors = np.ascontiguousarray(vectors, dtype=VECTOR_DTYPE).reshape(-1, dimension)
+        for name, data in ((VECTORS_FILE, vectors), (IDS_FILE, np.ascontiguousarray(ids))):
+            with open(self._file(name) + ".tmp", "wb") as f:
+                f.write(data.tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(self._file(VECTORS_FILE) + ".tmp", self._file(VECTORS_FILE))
+        os.replace(self._file(IDS_FILE) + ".tmp", self._file(IDS_FILE))
@@ -0,0 +1,261 @@
+import re
+import time
+from datetime import datetime
+from itertools import islice
+from typing import List, Dict, Any, Iterable, Iterator, Optional, Tuple
+from uuid import UUID
+import numpy as np
+from sqlalchemy.orm import Session
+from decouple import config
+from app.services.embedding_service import embedding_service
+from app.services.embedding_cache_service import embedding_cache_service, content_hash
+from app.services.document_catalog_service import document_catalog_service
+
+RETRIEVAL_MODES = ("vector", "hybrid", "lexical", "auto")
+
+SEARCH_FILTERS = ("document_ids", "sources", "created_after")
+
+_QUERY_TERM = re.compile(r"\w+")
+
+# Leading words that make a short query an instruction to the LLM rather than a lookup
+_INSTRUCTION_WORDS = frozenset({
+    "what", "who", "why", "how", "when", "where", "which",
+    "explain", "summarize", "summarise", "describe", "define", "compare", "list",
+    "give", "show", "tell", "write", "outline", "discuss", "help"
+})
+
+class VectorStoreService:
+    """
+    Behaviour shared by the vector store backends.
+    
+    Backends stream chunks through _embedded_batches, which embeds them in
+    windows of EMBEDDING_BATCH_SIZE behind the embedding cache, and use
+    _match_chunks to diff a re-ingested document against its stored chunks.
+    Every write also updates the document catalog in the same transaction,
+    and duplicate lookups and stats are answered from the catalog.
+    """
+    
+    # Whether the backend can answer lexical and hybrid searches
+    supports_lexical = False
+    
+    def __init__(self):
+        self.embedding_batch_size = max(1, int(config("EMBEDDING_BATCH_SIZE", default="32")))
+        self._seconds_per_chunk = 0.0  # Latest model cost per chunk, used to estimate cache savings
+        self.retrieval_mode = config("RETRIEVAL_MODE", default="vector").lower()
+        if self.retrieval_mode not in RETRIEVAL_MODES:
+            raise ValueError(
+                f"Unknown RETRIEVAL_MODE '{self.retrieval_mode}', expected one of: {', '.join(RETRIEVAL_MODES)}"
+            )
+        self.lexical_max_terms = int(config("LEXICAL_MAX_TERMS", default="3"))
+    
+    def is_keyword_query(self, query: str) -> bool:
+        """Short lookups like a term or a named theorem, as opposed to a question"""
+        terms = _QUERY_TERM.findall(query)
+        return (
+            0 < len(terms) <= self.lexical_max_terms
+            and not query.rstrip().endswith("?")
+            and terms[0].lower() not in _INSTRUCTION_WORDS
+        )
+    
+    def resolve_retrieval_mode(self, query: str, mode: Optional[str] = None) -> str:
+        """
+        The concrete mode a search runs in: vector, hybrid or lexical. auto
+        picks lexical for keyword queries and hybrid otherwise; backends without
+        full-text search always run vector.
+        """
+        mode = (mode or self.retrieval_mode).lower()
+        if mode not in RETRIEVAL_MODES:
+            raise ValueError(f"Unknown retrieval mode '{mode}', expected one of: {', '.join(RETRIEVAL_MODES)}")
+        if not self.supports_lexical:
+            return "vector"
+        if mode == "auto":
+            return "lexical" if self.is_keyword_query(query) else "hybrid"
+        return mode
+    
+    @property
+    def embedding_dimension(self) -> int:
+        return embedding_service.get_dimension()
+    
+    def _embedded_batches(
+        self,
+        db: Session,
+        documents: Iterable[Dict[str, Any]],
+        embed_stats: Dict[str, Any]
+    ) -> Iterator[Tuple[List[Dict[str, Any]], np.ndarray]]:
+        """Consume documents in windows, yielding each window with its float32 embeddings"""
+        documents = iter(documents)
+        while True:
+            batch = list(islice(documents, self.embedding_batch_size))
+            if not batch:
+                break
+            
+            for doc in batch:
+                doc["content_hash"] = content_hash(doc["content"])
+            embeddings = self._embed_batch(
+                db, [doc["content"] for doc in batch], [doc["content_hash"] for doc in batch], embed_stats
+            )
+            yield batch, embeddings
+    
+    def _embed_batch(
+        self,
+        db: Session,
+        texts: List[str],
+        hashes: List[str],
+        embed_stats: Dict[str, Any]
+    ) -> np.ndarray:
+        """
+        Embed a window of chunk texts, sending only cache misses to the model.
+        Returns a float32 (len(texts), dimension) array.
+        """
+        model_key = embedding_service.cache_key
+        embeddings = embedding_cache_service.get_many(db, model_key, hashes)
+        
+        # Identical chunks within the window are embedded once
+        missing = {}
+        for digest, content in zip(hashes, texts):
+            if digest not in embeddings and digest not in missing:
+                missing[digest] = content
+        
+        if missing:
+            started = time.perf_counter()
+            fresh = embedding_service.encode_array(list(missing.values()))
+            seconds = time.perf_counter() - started
+            
+            fresh = dict(zip(missing.keys(), fresh))
+            embedding_cache_service.put_many(db, model_key, fresh)
+            embeddings.update(fresh)
+            
+            embed_stats["embedded_chunks"] += len(missing)
+            embed_stats["embedding_seconds"] += seconds
+            self._seconds_per_chunk = seconds / len(missing)
+        
+        embed_stats["cache_hits"] += len(texts) - len(missing)
+        return np.stack([embeddings[digest] for digest in hashes])
+    
+    def _record_embedding_stats(
+        self,
+        stats: Optional[Dict[str, Any]],
+        embed_stats: Dict[str, Any],
+        total_chunks: int
+    ) -> None:
+        """Record embedding throughput and cache effectiveness into stats"""
+        if stats is None:
+            return
+        
+        embedded_chunks = embed_stats["embedded_chunks"]
+        embedding_seconds = embed_stats["embedding_seconds"]
+        cache_hits = embed_stats["cache_hits"]
+        stats["embedded_chunks"] = embedded_chunks
+        stats["embedding_seconds"] = round(embedding_seconds, 4)
+        stats["embedding_chunks_per_sec"] = (
+            round(embedded_chunks / embedding_seconds, 2) if embedding_seconds > 0 else 0.0
+        )
+        stats["cache_hits"] = cache_hits
+        stats["cache_misses"] = total_chunks - cache_hits
+        stats["cache_hit_rate"] = round(cache_hits / total_chunks, 4) if total_chunks else 0.0
+        stats["saved_embedding_seconds"] = round(cache_hits * self._seconds_per_chunk, 4)
+    
+    def _chunk_metadata(self, doc: Dict[str, Any]) -> Dict[str, Any]:
+        """Metadata stored alongside a chunk"""
+        metadata = {
+            "source": doc.get("source", "unknown"),
+            "chunk_index": doc.get("chunk_index", 0),
+            "title": doc.get("title", ""),
+            "document_id": doc.get("document_id", ""),
+            "token_count": doc.get("token_count", 0),
+            "content_hash": doc.get("content_hash") or content_hash(doc["content"])
+        }
+        if "page_start" in doc:
+            metadata["page_start"] = doc["page_start"]
+            metadata["page_end"] = doc["page_end"]
+        if doc.get("file_hash"):
+            metadata["file_hash"] = doc["file_hash"]
+        return metadata
+    
+    def _match_chunks(
+        self,
+        stored_chunks: Iterable[Tuple[str, int, str]],
+        documents: List[Dict[str, Any]]
+    ) -> Tuple[List[Tuple[str, Dict[str, Any]]], List[Tuple[str, Dict[str, Any]]], List[Dict[str, Any]], List[str]]:
+        """
+        Diff a new version of a document against its stored (id, chunk_index,
+        content_hash) rows.
+        
+        Chunks are matched by content hash, preferring rows at the same
+        chunk_index. Returns the rows kept at their chunk_index and the rows
+        that only moved, each as (row id, new chunk), the chunks that must be
+        embedded and inserted, and the ids of rows to delete.
+        """
+        # Stored rows by content hash, then by chunk_index
+        stored: Dict[str, Dict[int, str]] = {}
+        for row_id, chunk_index, digest in stored_chunks:
+            stored.setdefault(digest, {})[chunk_index] = row_id
+        
+        for doc in documents:
+            doc["content_hash"] = content_hash(doc["content"])
+        
+        # First pass keeps rows that are unchanged in place
+        pending = []
+        unchanged = []
+        for doc in documents:
+            row_id = stored.get(doc["content_hash"], {}).pop(doc["chunk_index"], None)
+            if row_id:
+                unchanged.append((row_id, doc))
+            else:
+                pending.append(doc)
+        
+        # Second pass reuses rows whose content only moved
+        moved = []
+        new_documents = []
+        for doc in pending:
+            candidates = stored.get(doc["content_hash"])
+            if candidates:
+                _, row_id = candidates.popitem()
+                moved.append((row_id, doc))
+            else:
+                new_documents.append(doc)
+        
+        removed_ids = [row_id for rows in stored.values() for row_id in rows.values()]
+        return unchanged, moved, new_documents, removed_ids
+    
+    def normalize_filters(self, filters: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Validate search filters, dropping empty ones: document_ids and sources
+        are lists of strings, created_after a datetime or ISO timestamp
+        """
+        normalized: Dict[str, Any] = {}
+        for name, value in (filters or {}).items():
+            if name not in SEARCH_FILTERS:
+                raise ValueError(f"Unknown search filter '{name}', expected one of: {', '.join(SEARCH_FILTERS)}")
+            if value is None or value == []:
+                continue
+            if name == "document_ids":
+                normalized[name] = [str(UUID(str(document_id))) for document_id in value]
+            elif name == "sources":
+                normalized[name] = [str(source) for source in value]
+            else:
+                normalized[name] = value if isinstance(value, datetime) else datetime.fromisoformat(value)
+        return normalized
+    
+    def _summarize_document(self, document_id: str, documents: Iterable[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """Catalog summary of a document's full set of chunks, or None when it has none"""
+        summaries: Dict[str, Dict[str, Any]] = {}
+        for _ in document_catalog_service.tally(documents, summaries):
+            pass
+        return summaries.get(document_id)
+    
+    def find_document_by_hash(self, db: Session, user_id: str, file_hash: str) -> Optional[Dict[str, Any]]:
+        """Find a document the user already ingested from identical content"""
+        try:
+            return document_catalog_service.find_by_hash(db, user_id, file_hash)
+        
+        except Exception as e:
+            raise Exception(f"Error finding document by hash: {str(e)}")
+    
+    def get_document_stats(self, db: Session, user_id: str) -> Dict[str, Any]:
+        """Get statistics about user's documents from the document catalog"""
+        try:
+            return document_catalog_service.get_stats(db, user_id)
+        
+        except Exception as e:
+            raise Exception(f"Error getting document stats: {str(e)}")
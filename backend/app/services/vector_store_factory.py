@@ -1,17 +1,27 @@
+from decouple import config
 from app.services.pgvector_store_service import pgvector_store_service
 
+VECTOR_STORE_TYPES = ("pgvector", "faiss")
+
 class VectorStoreFactory:
     """Factory for creating vector store services"""
     
     @staticmethod
     def get_vector_store():
-        """Get the pgvector store service"""
+        """Get the vector store service selected by VECTOR_STORE_TYPE"""
+        if VectorStoreFactory.get_vector_store_type() == "faiss":
+            # Imported on demand so pgvector deployments never load FAISS
+            from app.services.faiss_store_service import faiss_store_service
+            return faiss_store_service
         return pgvector_store_service
     
     @staticmethod
     def get_vector_store_type() -> str:
         """Get the current vector store type"""
-        return "pgvector"
+        store_type = config("VECTOR_STORE_TYPE", default="pgvector").lower()
+        if store_type not in VECTOR_STORE_TYPES:
+            raise ValueError(f"Unknown VECTOR_STORE_TYPE: {store_type}")
+        return store_type
 
 # Global factory instance
 vector_store_factory = VectorStoreFactory()
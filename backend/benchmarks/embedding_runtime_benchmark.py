@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Throughput and parity benchmark for embedding runtimes
+
+Loads the embedding model once per runtime (torch fp32, int8 dynamic
+quantization, ONNX Runtime) and reports batch throughput, single-query
+latency and cosine agreement with the fp32 vectors on a sample corpus.
+Runtimes whose dependencies are missing are reported and skipped.
+
+Usage:
+    python benchmarks/embedding_runtime_benchmark.py [--runtimes torch,int8,onnx] [--texts 2000]
+"""
+
+import argparse
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+# Add the backend directory to the Python path
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from app.services.embedding_service import embedding_service, load_sentence_transformer, cosine_agreement
+
+TOPICS = [
+    "photosynthesis", "the French Revolution", "linear algebra", "cell division",
+    "supply and demand", "plate tectonics", "Shakespeare's sonnets", "recursion",
+    "the water cycle", "Newton's laws", "the immune system", "probability"
+]
+
+def generate_corpus(num_texts: int):
+    """Generate study-guide style passages of varying length"""
+    rng = random.Random(0)
+    corpus = []
+    for i in range(num_texts):
+        topic = rng.choice(TOPICS)
+        sentences = [
+            f"Section {i} explains {topic} with worked examples.",
+            f"Students often confuse {topic} with {rng.choice(TOPICS)}.",
+            f"A key idea in {topic} is that small changes compound over time.",
+            f"Review question: how does {topic} relate to {rng.choice(TOPICS)}?"
+        ]
+        corpus.append(" ".join(rng.choice(sentences) for _ in range(rng.randint(2, 12))))
+    return corpus
+
+def run_benchmark(runtimes, num_texts: int, batch_size: int, onnx_file):
+    """Report throughput, latency and fp32 agreement for each runtime"""
+    model_name = embedding_service.model_name
+    corpus = generate_corpus(num_texts)
+    queries = corpus[:50]
+    print(f"🧪 Benchmarking {model_name}: {num_texts} texts, batch size {batch_size}")
+    
+    reference = None
+    print(f"\n{'runtime':>8} {'load (s)':>9} {'texts/sec':>10} {'query p50 (ms)':>15} "
+          f"{'mean cos':>9} {'min cos':>9}")
+    for runtime in runtimes:
+        try:
+            started = time.perf_counter()
+            model = load_sentence_transformer(model_name, runtime, onnx_file if runtime == "onnx" else None)
+            load_seconds = time.perf_counter() - started
+        except Exception as e:
+            print(f"{runtime:>8} skipped: {e}")
+            continue
+        
+        model.encode(queries[:4], convert_to_numpy=True)
+        started = time.perf_counter()
+        embeddings = model.encode(corpus, batch_size=batch_size, convert_to_numpy=True)
+        texts_per_sec = num_texts / (time.perf_counter() - started)
+        
+        latencies = []
+        for query in queries:
+            started = time.perf_counter()
+            model.encode([query], convert_to_numpy=True)
+            latencies.append((time.perf_counter() - started) * 1000)
+        
+        if reference is None:
+            reference = embeddings if runtime == "torch" else load_sentence_transformer(
+                model_name, "torch"
+            ).encode(corpus, batch_size=batch_size, convert_to_numpy=True)
+        agreement = cosine_agreement(embeddings, reference)
+        print(f"{runtime:>8} {load_seconds:>9.2f} {texts_per_sec:>10.1f} "
+              f"{statistics.median(latencies):>15.2f} {agreement['mean_cosine']:>9.4f} "
+              f"{agreement['min_cosine']:>9.4f}")
+    
+    print("\n✅ Cosine columns compare each runtime with the fp32 torch vectors")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark embedding runtimes")
+    parser.add_argument("--runtimes", default="torch,int8,onnx")
+    parser.add_argument("--texts", type=int, default=2000)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--onnx-file", default=None)
+    args = parser.parse_args()
+    
+    run_benchmark(args.runtimes.split(","), args.texts, args.batch_size, args.onnx_file)
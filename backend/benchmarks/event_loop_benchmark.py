@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Event loop responsiveness benchmark
+
+Starts uvicorn, measures GET /health latency at rest, then measures it again
+while a large text document is being uploaded and ingested. Ingestion runs in
+the shared executors, so /health latency should stay flat; the script exits
+with status 1 if p99 latency during the upload exceeds the limit, which makes
+it usable as a regression check.
+
+Usage:
+    python benchmarks/event_loop_benchmark.py [--words 400000] [--max-p99-ms 100]
+"""
+
+import argparse
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+WORDS = [
+    "retrieval", "augmented", "generation", "embedding", "vector", "index",
+    "query", "document", "chunk", "token", "similarity", "context", "model",
+    "latency", "throughput", "database", "search", "answer", "student", "guide"
+]
+
+def generate_text(num_words: int) -> str:
+    """Generate sentence-structured filler text"""
+    rng = random.Random(0)
+    sentences = []
+    remaining = num_words
+    while remaining > 0:
+        length = min(remaining, rng.randint(8, 24))
+        sentences.append(" ".join(rng.choice(WORDS) for _ in range(length)).capitalize() + ".")
+        remaining -= length
+    return " ".join(sentences)
+
+def wait_for(url: str, timeout: float) -> None:
+    """Poll url until it returns 200"""
+    started = time.perf_counter()
+    while time.perf_counter() - started < timeout:
+        try:
+            with urllib.request.urlopen(url, timeout=1) as response:
+                if response.status == 200:
+                    return
+        except (urllib.error.URLError, ConnectionError, OSError):
+            pass
+        time.sleep(0.05)
+    raise TimeoutError(f"{url} did not become available within {timeout}s")
+
+def sample_health(url: str, samples: int, interval: float, keep_going=None):
+    """Time GET /health repeatedly; return latencies in milliseconds"""
+    latencies = []
+    while len(latencies) < samples or (keep_going is not None and keep_going()):
+        started = time.perf_counter()
+        with urllib.request.urlopen(url, timeout=30) as response:
+            response.read()
+        latencies.append((time.perf_counter() - started) * 1000)
+        time.sleep(interval)
+    return latencies
+
+def percentile(values, fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+def upload(base_url: str, text: str, result: dict) -> None:
+    """POST a text document to /documents/upload and record the outcome"""
+    body = urllib.parse.urlencode({
+        "text_content": text,
+        "title": "Event loop benchmark",
+        "user_id": "benchmark-user",
+        "force": "true"
+    }).encode()
+    request = urllib.request.Request(
+        f"{base_url}/documents/upload", data=body,
+        headers={"Content-Type": "application/x-www-form-urlencoded"}
+    )
+    started = time.perf_counter()
+    try:
+        with urllib.request.urlopen(request, timeout=600) as response:
+            result["status"] = response.status
+    except urllib.error.HTTPError as e:
+        result["status"] = e.code
+    result["seconds"] = time.perf_counter() - started
+
+def run_benchmark(words: int, port: int, samples: int, max_p99_ms: float, timeout: float) -> bool:
+    """Compare /health latency at rest and during an upload; return True if it stayed flat"""
+    base_url = f"http://127.0.0.1:{port}"
+    health_url = f"{base_url}/health"
+    
+    print("🧪 Benchmarking event loop responsiveness during ingestion...")
+    text = generate_text(words)
+    print(f"📄 Generated {words} words ({len(text) / 1024 / 1024:.1f} MiB)")
+    
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port)],
+        cwd=BACKEND_DIR,
+        env=dict(os.environ, EMBEDDING_PRELOAD="true"),
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL
+    )
+    try:
+        wait_for(health_url, timeout)
+        wait_for(f"{health_url}/ready", timeout)
+        
+        idle = sample_health(health_url, samples, 0.01)
+        
+        result = {}
+        uploader = threading.Thread(target=upload, args=(base_url, text, result))
+        uploader.start()
+        busy = sample_health(health_url, samples, 0.01, keep_going=uploader.is_alive)
+        uploader.join()
+    finally:
+        server.terminate()
+        server.wait()
+    
+    print(f"\n{'phase':<16} {'samples':>8} {'p50 (ms)':>10} {'p99 (ms)':>10} {'max (ms)':>10}")
+    for name, latencies in (("idle", idle), ("during upload", busy)):
+        print(f"{name:<16} {len(latencies):>8} {percentile(latencies, 0.5):>10.1f} "
+              f"{percentile(latencies, 0.99):>10.1f} {max(latencies):>10.1f}")
+    print(f"\nUpload returned HTTP {result.get('status')} after {result.get('seconds', 0):.1f}s")
+    
+    busy_p99 = percentile(busy, 0.99)
+    if busy_p99 > max_p99_ms:
+        print(f"❌ /health p99 during upload was {busy_p99:.1f}ms (limit {max_p99_ms:.0f}ms)")
+        return False
+    print(f"✅ /health p99 during upload stayed at {busy_p99:.1f}ms (limit {max_p99_ms:.0f}ms)")
+    return True
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark /health latency during a large upload")
+    parser.add_argument("--words", type=int, default=400000)
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--samples", type=int, default=200)
+    parser.add_argument("--max-p99-ms", type=float, default=100.0)
+    parser.add_argument("--timeout", type=float, default=300.0)
+    args = parser.parse_args()
+    
+    ok = run_benchmark(args.words, args.port, args.samples, args.max_p99_ms, args.timeout)
+    sys.exit(0 if ok else 1)
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Benchmark for multi-core PDF text extraction
+
+Extracts a PDF serially and with process pools of increasing size, checks
+that every parallel run matches the serial output exactly and reports
+pages/sec per worker count.
+
+Usage:
+    python benchmarks/pdf_extraction_benchmark.py path/to/book.pdf [--workers 1,2,4,8]
+"""
+
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+# Add the backend directory to the Python path
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from app.services.document_processor import document_processor
+
+def run_benchmark(file_path: str, worker_counts):
+    """Time page extraction for each worker count"""
+    print(f"🧪 Benchmarking PDF extraction: {file_path}")
+    print(f"   cores available: {os.cpu_count()}, pages per task: {document_processor.pages_per_task}")
+    
+    start = time.perf_counter()
+    serial_pages = list(document_processor.iter_pdf_pages(file_path, workers=1))
+    serial_seconds = time.perf_counter() - start
+    num_pages = len(serial_pages)
+    
+    print(f"{'workers':>8} {'seconds':>10} {'pages/sec':>10} {'speedup':>8} {'matches':>8}")
+    print(f"{1:>8} {serial_seconds:>10.3f} {num_pages / serial_seconds:>10.1f} {1.0:>8.2f} {'yes':>8}")
+    
+    for workers in worker_counts:
+        if workers <= 1:
+            continue
+        start = time.perf_counter()
+        pages = list(document_processor.iter_pdf_pages(file_path, workers=workers))
+        seconds = time.perf_counter() - start
+        matches = "yes" if pages == serial_pages else "NO"
+        print(f"{workers:>8} {seconds:>10.3f} {num_pages / seconds:>10.1f} {serial_seconds / seconds:>8.2f} {matches:>8}")
+    
+    print(f"\n✅ Extracted {num_pages} pages")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark PDF text extraction")
+    parser.add_argument("file_path", help="PDF file to extract")
+    parser.add_argument("--workers", default="1,2,4,8", help="Comma-separated worker counts")
+    args = parser.parse_args()
+    
+    run_benchmark(args.file_path, [int(workers) for workers in args.workers.split(",")])
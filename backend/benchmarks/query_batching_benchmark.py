@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Load benchmark for query-embedding micro-batching
+
+Fires concurrent query embeddings at EmbeddingService.aembed_query with the
+micro-batcher disabled (one encode per query) and enabled, and reports
+queries/sec and p50/p99 latency for each. Every query is unique so the
+query cache never answers.
+
+Usage:
+    python benchmarks/query_batching_benchmark.py [--queries 2000] [--concurrency 64]
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+# Add the backend directory to the Python path
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from app.services.embedding_service import embedding_service
+
+def percentile(values, fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+async def run_load(num_queries: int, concurrency: int, label: str):
+    """Run num_queries unique queries with at most concurrency in flight"""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    
+    async def one_query(i: int):
+        async with semaphore:
+            started = time.perf_counter()
+            await embedding_service.aembed_query(f"{label} question {i}: summarize chapter {i % 40}")
+            latencies.append(time.perf_counter() - started)
+    
+    started = time.perf_counter()
+    await asyncio.gather(*(one_query(i) for i in range(num_queries)))
+    return num_queries / (time.perf_counter() - started), latencies
+
+def run_benchmark(num_queries: int, concurrency: int):
+    """Compare throughput and tail latency with and without micro-batching"""
+    print(f"🧪 Benchmarking query embedding: {num_queries} queries, concurrency {concurrency}")
+    print(f"   max batch size {embedding_service.batcher.max_batch_size}, "
+          f"max wait {embedding_service.batcher.max_wait * 1000:.1f} ms")
+    embedding_service.generate_single_embedding("warm-up")
+    
+    print(f"{'mode':>12} {'queries/sec':>12} {'p50 (ms)':>10} {'p99 (ms)':>10}")
+    for label, enabled in (("unbatched", False), ("microbatch", True)):
+        embedding_service.microbatch_enabled = enabled
+        embedding_service.query_cache.clear()
+        qps, latencies = asyncio.run(run_load(num_queries, concurrency, label))
+        print(f"{label:>12} {qps:>12.1f} {percentile(latencies, 0.5) * 1000:>10.2f} "
+              f"{percentile(latencies, 0.99) * 1000:>10.2f}")
+    
+    print(f"\n✅ Micro-batcher stats: {embedding_service.batcher.stats()}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark query-embedding micro-batching")
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    args = parser.parse_args()
+    
+    run_benchmark(args.queries, args.concurrency)
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Startup benchmark for the API server
+
+Starts uvicorn and measures the time until GET /health first answers and
+until GET /health/ready reports the embedding model warm, once with lazy
+loading and once with an eager baseline that loads and warms the model
+before the app is imported, as the server did before lazy loading.
+
+Usage:
+    python benchmarks/startup_benchmark.py [--runs 3] [--port 8765]
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+# Eager baseline: block on the model before uvicorn imports the app
+EAGER_LAUNCHER = (
+    "import sys, uvicorn\n"
+    "from app.services.embedding_service import embedding_service\n"
+    "embedding_service.encode_array(['warm-up'])\n"
+    "uvicorn.run('app.main:app', port=int(sys.argv[1]))\n"
+)
+
+def wait_for(url: str, started: float, timeout: float) -> float:
+    """Poll url until it returns 200; return seconds since started"""
+    while time.perf_counter() - started < timeout:
+        try:
+            with urllib.request.urlopen(url, timeout=1) as response:
+                if response.status == 200:
+                    return time.perf_counter() - started
+        except (urllib.error.URLError, ConnectionError, OSError):
+            pass
+        time.sleep(0.01)
+    raise TimeoutError(f"{url} did not become available within {timeout}s")
+
+def measure_startup(port: int, timeout: float, eager: bool = False):
+    """Start one server and time /health and /health/ready"""
+    if eager:
+        command = [sys.executable, "-c", EAGER_LAUNCHER, str(port)]
+    else:
+        command = [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port)]
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        command,
+        cwd=BACKEND_DIR,
+        env=dict(os.environ, EMBEDDING_PRELOAD="true"),
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL
+    )
+    try:
+        health_seconds = wait_for(f"http://127.0.0.1:{port}/health", started, timeout)
+        ready_seconds = wait_for(f"http://127.0.0.1:{port}/health/ready", started, timeout)
+        return health_seconds, ready_seconds
+    finally:
+        server.terminate()
+        server.wait()
+
+def run_benchmark(runs: int, port: int, timeout: float):
+    """Report time-to-first-/health and time-to-ready over several cold starts"""
+    print("🧪 Benchmarking API startup...")
+    print(f"{'mode':>6} {'run':>4} {'/health (s)':>12} {'/health/ready (s)':>18}")
+    
+    best = {}
+    for mode in ("eager", "lazy"):
+        results = []
+        for run in range(1, runs + 1):
+            health_seconds, ready_seconds = measure_startup(port, timeout, eager=mode == "eager")
+            results.append((health_seconds, ready_seconds))
+            print(f"{mode:>6} {run:>4} {health_seconds:>12.2f} {ready_seconds:>18.2f}")
+        best[mode] = (
+            min(health for health, _ in results),
+            min(ready for _, ready in results)
+        )
+    
+    print(f"\n✅ Time to first /health: {best['lazy'][0]:.2f}s with lazy loading "
+          f"vs {best['eager'][0]:.2f}s when the model loads at import")
+    print(f"✅ Time to ready: {best['lazy'][1]:.2f}s with lazy loading "
+          f"vs {best['eager'][1]:.2f}s when the model loads at import")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark API startup time")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--timeout", type=float, default=300.0)
+    args = parser.parse_args()
+    
+    run_benchmark(args.runs, args.port, args.timeout)
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Migrate the documents table to typed chunk columns.
+
+Adds document_id, chunk_index, title, source and token_count as columns with
+a btree on (user_id, document_id, chunk_index), then backfills them from the
+metadata JSONB of existing rows in batches walked in primary-key order,
+removing the copied keys from metadata. Safe to re-run: only rows that still carry the keys are touched.
+"""
+
+import sys
+import time
+import argparse
+from pathlib import Path
+from sqlalchemy import text
+
+# Add the backend directory to the Python path
+sys.path.append(str(Path(__file__).resolve().parent))
+
+from app.db.base import SessionLocal
+from app.services.pgvector_store_service import pgvector_store_service
+
+# Walks the primary key in keyset order, so each batch is an index range scan
+# past the last id instead of a rescan of rows (and dead tuples) already migrated
+BACKFILL_SQL = """
+    WITH batch AS (
+        SELECT id FROM documents
+        WHERE id > CAST(:last_id AS uuid)
+        ORDER BY id
+        LIMIT :batch_size
+    ),
+    migrated AS (
+        UPDATE documents
+        SET
+            document_id = CAST(NULLIF(metadata->>'document_id', '') AS uuid),
+            chunk_index = COALESCE((metadata->>'chunk_index')::int, 0),
+            title = metadata->>'title',
+            source = metadata->>'source',
+            token_count = COALESCE((metadata->>'token_count')::int, 0),
+            metadata = metadata - 'document_id' - 'chunk_index' - 'title' - 'source' - 'token_count'
+        FROM batch
+        WHERE documents.id = batch.id
+          AND documents.metadata ?| array['document_id', 'chunk_index', 'title', 'source', 'token_count']
+        RETURNING documents.id
+    )
+    SELECT
+        (SELECT CAST(id AS text) FROM batch ORDER BY id DESC LIMIT 1) AS last_id,
+        (SELECT count(*) FROM migrated) AS migrated
+"""
+
+FIRST_ID = "00000000-0000-0000-0000-000000000000"
+
+def migrate_chunk_columns(batch_size: int):
+    """Add the chunk columns and backfill them from metadata"""
+    print("🔧 Migrating documents to typed chunk columns...")
+    
+    db = SessionLocal()
+    try:
+        print("📋 Adding columns and index...")
+        for statement in pgvector_store_service.chunk_column_sql():
+            db.execute(text(statement))
+        db.commit()
+        
+        print(f"📥 Backfilling in batches of {batch_size}...")
+        started = time.perf_counter()
+        total = 0
+        last_id = FIRST_ID
+        while True:
+            row = db.execute(text(BACKFILL_SQL), {"last_id": last_id, "batch_size": batch_size}).one()
+            db.commit()
+            if row.last_id is None:
+                break
+            last_id = row.last_id
+            total += row.migrated
+            print(f"   {total} rows migrated (through id {last_id})")
+        
+        db.execute(text("ANALYZE documents"))
+        db.commit()
+        print(f"✅ Migrated {total} rows in {time.perf_counter() - started:.1f}s")
+        
+    except Exception as e:
+        db.rollback()
+        print(f"❌ Error migrating chunk columns: {str(e)}")
+        raise
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Promote chunk metadata to documents columns")
+    parser.add_argument("--batch-size", type=int, default=5000)
+    args = parser.parse_args()
+    
+    try:
+        migrate_chunk_columns(args.batch_size)
+    except Exception:
+        sys.exit(1)
@@ -0,0 +1,39 @@
+#!/usr/bin/env python3
+"""
+Rebuild the document catalog from the chunks in the vector store.
+
+The API builds the catalog at startup when it is empty but chunks exist, so
+this is only needed to resync a catalog that has drifted from the chunks;
+the catalog is maintained by ingest and delete from then on.
+"""
+
+import sys
+from pathlib import Path
+
+# Add the backend directory to the Python path
+sys.path.append(str(Path(__file__).resolve().parent))
+
+from app.db.base import SessionLocal, engine, Base
+from app.db.models import Document, DocumentChunk  # Import models to register them
+from app.services.document_catalog_service import document_catalog_service
+from app.services.vector_store_factory import vector_store_factory
+
+def rebuild_document_catalog():
+    """Replace the catalog with one entry per stored document"""
+    print(f"📚 Rebuilding document catalog from the {vector_store_factory.get_vector_store_type()} store...")
+    Base.metadata.create_all(bind=engine)
+    
+    db = SessionLocal()
+    try:
+        vector_store = vector_store_factory.get_vector_store()
+        total = document_catalog_service.rebuild(db, vector_store.document_summaries(db))
+        print(f"✅ Cataloged {total} documents")
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    try:
+        rebuild_document_catalog()
+    except Exception as e:
+        print(f"❌ Rebuild failed: {str(e)}")
+        sys.exit(1)
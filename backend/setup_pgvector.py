@@ -8,6 +8,7 @@ import sys
 from pathlib import Path
 from sqlalchemy import text
 from app.db.base import SessionLocal
+from app.services.pgvector_store_service import pgvector_store_service
 
 def setup_pgvector():
     """Set up pgvector database schema"""
@@ -25,6 +26,11 @@ def setup_pgvector():
             CREATE TABLE IF NOT EXISTS documents (
                 id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
                 user_id UUID REFERENCES auth.users(id) ON DELETE CASCADE,
+                document_id UUID,
+                chunk_index INTEGER NOT NULL DEFAULT 0,
+                title TEXT,
+                source TEXT,
+                token_count INTEGER NOT NULL DEFAULT 0,
                 content TEXT NOT NULL,
                 embedding vector(384),
                 metadata JSONB DEFAULT '{}',
@@ -33,14 +39,32 @@ def setup_pgvector():
             )
         """))
         
-        # Create indexes
-        print("🔍 Creating indexes...")
+        # Create embedding cache table
+        print("🗃️ Creating embedding_cache table...")
         db.execute(text("""
-            CREATE INDEX IF NOT EXISTS documents_embedding_idx 
-            ON documents USING hnsw (embedding vector_cosine_ops) 
-            WITH (m = 16, ef_construction = 64)
+            CREATE TABLE IF NOT EXISTS embedding_cache (
+                model_name TEXT NOT NULL,
+                content_hash TEXT NOT NULL,
+                embedding vector NOT NULL,
+                created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+                PRIMARY KEY (model_name, content_hash)
+            )
         """))
         
+        # Create indexes
+        print(f"🔍 Creating indexes (HNSW m = {pgvector_store_service.hnsw_m}, "
+              f"ef_construction = {pgvector_store_service.hnsw_ef_construction})...")
+        db.execute(text(pgvector_store_service.hnsw_index_sql()))
+        
+        # Chunk columns for tables created before they existed; migrate_chunk_columns.py backfills them
+        for statement in pgvector_store_service.chunk_column_sql():
+            db.execute(text(statement))
+        
+        # Generated content_tsv column for lexical and hybrid search
+        print(f"🔤 Creating full-text search column and GIN index ({pgvector_store_service.text_search_config})...")
+        for statement in pgvector_store_service.full_text_search_sql():
+            db.execute(text(statement))
+        
         db.execute(text("""
             CREATE INDEX IF NOT EXISTS documents_user_id_idx 
             ON documents (user_id)
@@ -51,6 +75,9 @@ def setup_pgvector():
             ON documents (created_at)
         """))
         
+        # Duplicate uploads are found through the document catalog
+        db.execute(text("DROP INDEX IF EXISTS documents_file_hash_idx"))
+        
         # Create updated_at trigger
         print("⏰ Creating updated_at trigger...")
         db.execute(text("""